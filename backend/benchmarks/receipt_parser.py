@@ -0,0 +1,120 @@
+# benchmarks/receipt_parser.py
+# Receipt text parser benchmark: python -m benchmarks.receipt_parser
+# First checks parse_receipt_text against the regression corpus
+# (benchmarks/data/receipt_texts.jsonl: OCR-style texts with the expected
+# amount/date/merchant) and exits non-zero on any difference, then reports
+# throughput of the batch API against the previous regex + strptime parser.
+from __future__ import annotations
+import argparse
+import json
+import random
+import re
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+from benchmarks.receipt_ocr import _receipt_lines
+from src.uploads.parsing import parse_receipt_text, parse_receipt_texts
+
+CORPUS = Path(__file__).parent / "data" / "receipt_texts.jsonl"
+
+LEGACY_TOTAL_PATTERNS = [
+    r"total\s*[:\-]?\s*₹?\s*([0-9]+(?:\.[0-9]{1,2})?)",
+    r"amount\s*[:\-]?\s*₹?\s*([0-9]+(?:\.[0-9]{1,2})?)",
+    r"grand\s*total\s*[:\-]?\s*₹?\s*([0-9]+(?:\.[0-9]{1,2})?)",
+]
+LEGACY_DATE_FORMATS = ["%d-%m-%Y", "%d/%m/%Y", "%Y-%m-%d", "%d-%b-%Y", "%d %b %Y", "%m/%d/%Y"]
+
+def legacy_parse_receipt_text(text: str) -> Tuple[Optional[float], Optional[datetime], Optional[str]]:
+    # the parser before src/uploads/parsing.py, kept as the baseline
+    lines = [l.strip() for l in text.splitlines() if l.strip()]
+    merchant = None
+    for l in lines[:8]:
+        if re.search(r"[A-Za-z]{3,}", l) and len(l) <= 40:
+            merchant = l
+            break
+    amount = None
+    low_text = text.lower().replace(",", "")
+    for pat in LEGACY_TOTAL_PATTERNS:
+        m = re.search(pat, low_text)
+        if m:
+            amount = float(m.group(1))
+            break
+    if amount is None:
+        m2 = re.findall(r"₹?\s*([0-9]+(?:\.[0-9]{1,2})?)", low_text)
+        if m2:
+            amount = float(m2[-1])
+    date = None
+    for d in re.findall(r"(\d{1,2}[-/ ]\d{1,2}[-/ ]\d{2,4}|\d{4}-\d{2}-\d{2})", text):
+        for fmt in LEGACY_DATE_FORMATS:
+            try:
+                date = datetime.strptime(d.replace(" ", "-").replace("/", "-"), fmt)
+                break
+            except ValueError:
+                continue
+        if date:
+            break
+    return amount, date, merchant
+
+def _encode(parsed) -> dict:
+    amount, occurred_at, merchant = parsed
+    return {"amount": amount, "date": occurred_at.date().isoformat() if occurred_at else None, "merchant": merchant}
+
+def load_corpus(path: Path) -> List[dict]:
+    with path.open(encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def check_corpus(cases: List[dict]) -> int:
+    failures = 0
+    for i, case in enumerate(cases):
+        got = _encode(parse_receipt_text(case["text"]))
+        if got != case["expected"]:
+            failures += 1
+            print(f"  case {i}: expected {case['expected']} got {got}\n    {case['text']!r}")
+    return failures
+
+def synthetic_texts(count: int, seed: int = 0) -> List[str]:
+    # OCR-like noise: dropped/merged characters and stray symbols
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(count):
+        lines, _ = _receipt_lines(rng)
+        noisy = []
+        for line in lines:
+            if line and rng.random() < 0.15:
+                pos = rng.randrange(len(line))
+                line = line[:pos] + rng.choice(["", "|", "'", " ", "l"]) + line[pos + 1:]
+            noisy.append(line)
+        texts.append("\n".join(noisy))
+    return texts
+
+def _throughput(name: str, parse_all: Callable[[List[str]], list], texts: List[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        parse_all(texts)
+        best = min(best, time.perf_counter() - t0)
+    rate = len(texts) / best
+    print(f"  {name:<8} {rate:12,.0f} texts/s  ({best * 1e6 / len(texts):7.2f} us/text)")
+    return rate
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Regression-check and benchmark the receipt text parser")
+    parser.add_argument("--corpus", type=Path, default=CORPUS)
+    parser.add_argument("--synthetic", type=int, default=20000, help="synthetic texts for the throughput run")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    cases = load_corpus(args.corpus)
+    failures = check_corpus(cases)
+    print(f"regression corpus: {len(cases) - failures}/{len(cases)} match")
+    if failures:
+        raise SystemExit(1)
+
+    texts = [c["text"] for c in cases] + synthetic_texts(args.synthetic, args.seed)
+    print(f"throughput over {len(texts)} texts (best of {args.repeat})")
+    legacy = _throughput("legacy", lambda ts: [legacy_parse_receipt_text(t) for t in ts], texts, args.repeat)
+    current = _throughput("batch", parse_receipt_texts, texts, args.repeat)
+    print(f"  speedup  {current / legacy:12.2f}x")
@@ -0,0 +1,100 @@
+# benchmarks/statement_normalize.py
+# Statement table normalization benchmark: python -m benchmarks.statement_normalize
+# Builds synthetic camelot-style tables (all-string DataFrames, header in the
+# first row), checks that the column-wise normalize_table agrees with the
+# previous per-row loop, and reports rows/s for both.
+#
+# The previous parse_amount stripped commas before matching
+# -?\d{1,3}(?:,\d{3})*, so amounts of 1000 and above were cut to their first
+# three digits; the comparison only uses amounts below that.
+from __future__ import annotations
+import argparse
+import random
+import re
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from src.imports.service import guess_columns, normalize_table
+
+LEGACY_DATE_PATTERNS = [r"\d{4}-\d{2}-\d{2}", r"\d{2}/\d{2}/\d{4}", r"\d{2}-\d{2}-\d{4}", r"\d{2}\s\w{3}\s\d{4}"]
+LEGACY_AMOUNT_PATTERN = r"-?\d{1,3}(?:,\d{3})*(?:\.\d{1,2})?"
+
+def legacy_parse_date(s: str) -> Optional[datetime]:
+    s = s.strip()
+    for pat in LEGACY_DATE_PATTERNS:
+        if re.search(pat, s):
+            s2 = s.replace("/", "-").replace("  ", " ")
+            for fmt in ("%Y-%m-%d", "%d-%m-%Y", "%d %b %Y"):
+                try:
+                    return datetime.strptime(s2, fmt)
+                except ValueError:
+                    continue
+    return None
+
+def legacy_parse_amount(s: str) -> Optional[float]:
+    s2 = s.replace(",", "").replace("₹", "").strip()
+    m = re.search(LEGACY_AMOUNT_PATTERN, s2)
+    return float(m.group(0)) if m else None
+
+def legacy_normalize(df: pd.DataFrame) -> List[Dict]:
+    # to_rows + guess_columns + normalize_row as they were, one cell at a time
+    rows = df.replace("\n", " ", regex=True).values.tolist()
+    if not rows:
+        return []
+    mapping = guess_columns(rows[0])
+    out = []
+    for row in rows[1:]:
+        date_str = row[mapping["date"]] if mapping["date"] is not None else ""
+        amount_str = row[mapping["amount"]] if mapping["amount"] is not None else ""
+        desc = row[mapping["description"]] if mapping["description"] is not None else "Imported"
+        dt, amt = legacy_parse_date(date_str), legacy_parse_amount(amount_str)
+        if dt is None or amt is None:
+            continue
+        out.append({"occurred_at": dt, "amount": abs(amt), "type": "expense" if amt > 0 else "income",
+                    "merchant": desc[:100], "notes": "Imported from PDF"})
+    return out
+
+DATE_STYLES = ("%d/%m/%Y", "%Y-%m-%d", "%d-%m-%Y", "%d %b %Y")
+
+def synthetic_statement(rows: int, seed: int = 0, date_style: Optional[str] = None) -> pd.DataFrame:
+    rng = random.Random(seed)
+    style = date_style or rng.choice(DATE_STYLES)
+    day = date(2023, 1, 1)
+    data = [["Txn Date", "Narration", "Amount (INR)", "Balance"]]
+    for i in range(rows):
+        day += timedelta(days=rng.random() < 0.3)
+        amount = round(rng.uniform(-999, 999), 2)
+        if rng.random() < 0.02:
+            date_cell, amount_cell = "", "Opening balance"  # non-transaction rows
+        else:
+            date_cell, amount_cell = day.strftime(style), f"₹{amount:,.2f}"
+        data.append([date_cell, f"UPI/{rng.randrange(10**9)}/SHOP {i % 97}\nREF {i}", amount_cell, f"{rng.uniform(0, 1e5):,.2f}"])
+    return pd.DataFrame(data)
+
+def _time(fn, df: pd.DataFrame, repeat: int):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn(df)
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare column-wise and per-row statement normalization")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for n in args.rows:
+        for style in DATE_STYLES:
+            df = synthetic_statement(n, args.seed, style)
+            legacy_s, legacy_rows = _time(legacy_normalize, df, args.repeat)
+            new_s, new_rows = _time(normalize_table, df, args.repeat)
+            if new_rows != legacy_rows:
+                raise SystemExit(f"mismatch for {n} rows with dates like {style!r}")
+            print(f"{n:>7} rows  {style:<9} legacy {n / legacy_s:12,.0f} rows/s   "
+                  f"column-wise {n / new_s:12,.0f} rows/s   x{legacy_s / new_s:5.1f}")
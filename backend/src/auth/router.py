@@ -1,30 +1,31 @@
 # src/auth/router.py
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from src.db.session import get_db
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.db.session import get_async_db
 from src.auth.schemas import SignupIn, LoginIn, TokenOut
-from src.auth.models import User
 from src.auth.security import hash_password, verify_password, create_access_token
+from src.auth.service import get_user_by_email_async, create_user_async
 from src.core.exceptions import DuplicateEmailError
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
+# bcrypt is deliberately slow, so it runs in the threadpool instead of blocking the event loop
+
 @router.post("/signup", response_model=TokenOut)
-def signup(payload: SignupIn, db: Session = Depends(get_db)):
-    existing = db.query(User).filter(User.email == payload.email).first()
+async def signup(payload: SignupIn, db: AsyncSession = Depends(get_async_db)):
+    existing = await get_user_by_email_async(db, payload.email)
     if existing:
         raise DuplicateEmailError("Email already registered")
-    user = User(email=payload.email, password_hash=hash_password(payload.password))
-    db.add(user)
-    db.commit()
-    db.refresh(user)
+    password_hash = await run_in_threadpool(hash_password, payload.password)
+    user = await create_user_async(db, payload.email, password_hash)
     token = create_access_token(str(user.id))
     return TokenOut(access_token=token)
 
 @router.post("/login", response_model=TokenOut)
-def login(payload: LoginIn, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == payload.email).first()
-    if not user or not verify_password(payload.password, user.password_hash):
+async def login(payload: LoginIn, db: AsyncSession = Depends(get_async_db)):
+    user = await get_user_by_email_async(db, payload.email)
+    if not user or not await run_in_threadpool(verify_password, payload.password, user.password_hash):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
     token = create_access_token(str(user.id))
     return TokenOut(access_token=token)
@@ -1,4 +1,5 @@
-from pydantic import BaseModel, EmailStr
+from uuid import UUID
+from pydantic import BaseModel, ConfigDict, EmailStr
 
 class SignupIn(BaseModel):
     email: EmailStr
@@ -8,6 +9,12 @@ class LoginIn(BaseModel):
     email: EmailStr
     password: str
 
+class Principal(BaseModel):
+    # what most routes need from the caller, without loading the User row
+    model_config = ConfigDict(frozen=True, from_attributes=True)
+    id: UUID
+    email: str
+
 class TokenOut(BaseModel):
     access_token: str
     token_type: str = "bearer"
@@ -1,23 +1,127 @@
 # src/auth/service.py
+import hashlib
+import time
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from src.db.session import get_db
+from typing import Optional
+from uuid import UUID
+from src.db.session import get_db, get_async_db
 from src.auth.models import User
+from src.auth.schemas import Principal
 from src.auth.security import decode_token
+from src.core.cache import get_cache, get_version, bump_version
+from src.core.config import settings
 
 bearer = HTTPBearer(auto_error=False)
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(bearer),
-    db: Session = Depends(get_db),
-) -> User:
+def _auth_scope(user_id) -> str:
+    return f"auth:{user_id}"
+
+def invalidate_principal_cache(user_id: UUID) -> None:
+    # drops every cached token of this user at once
+    bump_version(_auth_scope(user_id))
+
+def _principal_key(token: str) -> str:
+    return "principal:" + hashlib.sha256(token.encode()).hexdigest()
+
+def _cached_principal(token: str) -> Optional[Principal]:
+    if settings.AUTH_CACHE_TTL_SECONDS <= 0:
+        return None
+    cached = get_cache().get(_principal_key(token))
+    if cached is None:
+        return None
+    principal = Principal(**cached["principal"])
+    if cached["version"] != get_version(_auth_scope(principal.id)):
+        return None
+    return principal
+
+def _remember_principal(token: str, payload: dict, principal: Principal, version: str) -> None:
+    # never cache past the token's own expiry
+    ttl = min(settings.AUTH_CACHE_TTL_SECONDS, payload.get("exp", 0) - time.time())
+    if ttl > 0:
+        get_cache().set(_principal_key(token), {"principal": principal.model_dump(mode="json"), "version": version}, ttl=ttl)
+
+def _verified_payload(credentials: Optional[HTTPAuthorizationCredentials]) -> dict:
     if credentials is None or credentials.scheme.lower() != "bearer":
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
     payload = decode_token(credentials.credentials)
     if not payload or "sub" not in payload:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-    user = db.get(User, payload["sub"])
+    return payload
+
+def _principal_from_user(user: Optional[User]) -> Principal:
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+    return Principal.model_validate(user)
+
+def get_current_principal(
+    credentials: HTTPAuthorizationCredentials = Depends(bearer),
+    db: Session = Depends(get_db),
+) -> Principal:
+    if credentials is not None and (principal := _cached_principal(credentials.credentials)):
+        return principal
+    payload = _verified_payload(credentials)
+    # read the version before the row so an invalidation racing with this lookup wins
+    version = get_version(_auth_scope(payload["sub"]))
+    principal = _principal_from_user(db.get(User, payload["sub"]))
+    _remember_principal(credentials.credentials, payload, principal, version)
+    return principal
+
+async def get_current_principal_async(
+    credentials: HTTPAuthorizationCredentials = Depends(bearer),
+    db: AsyncSession = Depends(get_async_db),
+) -> Principal:
+    if credentials is not None and (principal := _cached_principal(credentials.credentials)):
+        return principal
+    payload = _verified_payload(credentials)
+    version = get_version(_auth_scope(payload["sub"]))
+    principal = _principal_from_user(await db.get(User, payload["sub"]))
+    _remember_principal(credentials.credentials, payload, principal, version)
+    return principal
+
+def get_user_by_email(db: Session, email: str) -> Optional[User]:
+    return db.execute(select(User).where(User.email == email)).scalars().first()
+
+async def get_user_by_email_async(db: AsyncSession, email: str) -> Optional[User]:
+    return (await db.execute(select(User).where(User.email == email))).scalars().first()
+
+def create_user(db: Session, email: str, password_hash: str) -> User:
+    user = User(email=email, password_hash=password_hash)
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+async def create_user_async(db: AsyncSession, email: str, password_hash: str) -> User:
+    user = User(email=email, password_hash=password_hash)
+    db.add(user)
+    await db.commit()
+    await db.refresh(user)
+    return user
+
+def get_current_user(
+    principal: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_db),
+) -> User:
+    # full ORM row, for routes that need more than the principal
+    user = db.get(User, principal.id)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
     return user
+
+@event.listens_for(User, "after_update")
+def _user_updated(mapper, connection, target: User) -> None:
+    if inspect(target).attrs.password_hash.history.has_changes():
+        Session.object_session(target).info.setdefault("auth_invalidate", set()).add(target.id)
+
+@event.listens_for(User, "after_delete")
+def _user_deleted(mapper, connection, target: User) -> None:
+    Session.object_session(target).info.setdefault("auth_invalidate", set()).add(target.id)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session: Session) -> None:
+    for user_id in session.info.pop("auth_invalidate", ()):
+        invalidate_principal_cache(user_id)
@@ -1,5 +1,5 @@
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import ForeignKey, text
+from sqlalchemy import ForeignKey, text, CheckConstraint
 from src.db.base import Base
 import uuid
 from datetime import datetime
@@ -10,3 +10,22 @@ class Category(Base):
     user_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True)
     name: Mapped[str]
     created_at: Mapped[datetime] = mapped_column(server_default=text("now()"))
+
+class CategoryRule(Base):
+    # auto-categorization for imported transactions; see src/categories/rules.py
+    __tablename__ = "category_rules"
+    id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid.uuid4)
+    user_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True)
+    category_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("categories.id", ondelete="CASCADE"))
+    # lower runs first; the first matching rule wins
+    priority: Mapped[int] = mapped_column(default=0, server_default=text("0"))
+    # case-insensitive substring of the merchant, or a regex when merchant_regex
+    merchant_pattern: Mapped[str | None]
+    merchant_regex: Mapped[bool] = mapped_column(default=False, server_default=text("false"))
+    min_amount: Mapped[float | None]
+    max_amount: Mapped[float | None]
+    type: Mapped[str | None]
+    created_at: Mapped[datetime] = mapped_column(server_default=text("now()"))
+    __table_args__ = (
+        CheckConstraint("type in ('income','expense')"),
+    )
@@ -1,43 +1,86 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
 
-from src.db.session import get_db
-from src.auth.service import get_current_user
-from src.auth.models import User
-from src.categories.schemas import CategoryCreate, CategoryUpdate, CategoryOut
+from src.db.session import get_async_db
+from src.auth.service import get_current_principal_async
+from src.auth.schemas import Principal
+from src.categories.schemas import (
+    CategoryCreate, CategoryUpdate, CategoryOut,
+    CategoryRuleCreate, CategoryRuleUpdate, CategoryRuleOut, RuleApplyResult,
+)
 from src.categories.service import (
-    create_category, list_categories, get_category, update_category, delete_category
+    create_category_async, list_categories_async, get_category_async,
+    update_category_async, delete_category_async,
+    create_rule_async, list_rules_async, get_rule_async, update_rule_async, delete_rule_async, apply_rules_async,
 )
 
 router = APIRouter(prefix="/categories", tags=["categories"])
 
 @router.post("", response_model=CategoryOut, status_code=status.HTTP_201_CREATED)
-def create_cat(payload: CategoryCreate, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
-    return create_category(db, user, payload)
+async def create_cat(payload: CategoryCreate, db: AsyncSession = Depends(get_async_db), user: Principal = Depends(get_current_principal_async)):
+    return await create_category_async(db, user, payload)
 
 @router.get("", response_model=list[CategoryOut])
-def list_cat(db: Session = Depends(get_db), user: User = Depends(get_current_user)):
-    return list_categories(db, user)
+async def list_cat(db: AsyncSession = Depends(get_async_db), user: Principal = Depends(get_current_principal_async)):
+    return await list_categories_async(db, user)
+
+# rules routes come before /{category_id} so "rules" is not parsed as an id
+
+@router.post("/rules", response_model=CategoryRuleOut, status_code=status.HTTP_201_CREATED)
+async def create_rule(payload: CategoryRuleCreate, db: AsyncSession = Depends(get_async_db), user: Principal = Depends(get_current_principal_async)):
+    if not await get_category_async(db, user, payload.category_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category not found")
+    return await create_rule_async(db, user, payload)
+
+@router.get("/rules", response_model=list[CategoryRuleOut])
+async def list_rules(db: AsyncSession = Depends(get_async_db), user: Principal = Depends(get_current_principal_async)):
+    # in evaluation order: the first matching rule sets the category
+    return await list_rules_async(db, user)
+
+@router.post("/rules/apply", response_model=RuleApplyResult)
+async def apply_rules(
+    only_uncategorized: bool = Query(default=True),  # false also re-categorizes rows a rule now maps elsewhere
+    db: AsyncSession = Depends(get_async_db),
+    user: Principal = Depends(get_current_principal_async),
+):
+    return RuleApplyResult(updated=await apply_rules_async(db, user, only_uncategorized))
+
+@router.patch("/rules/{rule_id}", response_model=CategoryRuleOut)
+async def patch_rule(rule_id: UUID, payload: CategoryRuleUpdate, db: AsyncSession = Depends(get_async_db), user: Principal = Depends(get_current_principal_async)):
+    rule = await get_rule_async(db, user, rule_id)
+    if not rule:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Rule not found")
+    if payload.category_id and not await get_category_async(db, user, payload.category_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category not found")
+    return await update_rule_async(db, user, rule, payload)
+
+@router.delete("/rules/{rule_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_rule(rule_id: UUID, db: AsyncSession = Depends(get_async_db), user: Principal = Depends(get_current_principal_async)):
+    rule = await get_rule_async(db, user, rule_id)
+    if not rule:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Rule not found")
+    await delete_rule_async(db, user, rule)
+    return None
 
 @router.get("/{category_id}", response_model=CategoryOut)
-def get_cat(category_id: UUID, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
-    cat = get_category(db, user, category_id)
+async def get_cat(category_id: UUID, db: AsyncSession = Depends(get_async_db), user: Principal = Depends(get_current_principal_async)):
+    cat = await get_category_async(db, user, category_id)
     if not cat:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category not found")
     return cat
 
 @router.patch("/{category_id}", response_model=CategoryOut)
-def patch_cat(category_id: UUID, payload: CategoryUpdate, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
-    cat = get_category(db, user, category_id)
+async def patch_cat(category_id: UUID, payload: CategoryUpdate, db: AsyncSession = Depends(get_async_db), user: Principal = Depends(get_current_principal_async)):
+    cat = await get_category_async(db, user, category_id)
     if not cat:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category not found")
-    return update_category(db, user, cat, payload)
+    return await update_category_async(db, user, cat, payload)
 
 @router.delete("/{category_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_cat(category_id: UUID, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
-    cat = get_category(db, user, category_id)
+async def delete_cat(category_id: UUID, db: AsyncSession = Depends(get_async_db), user: Principal = Depends(get_current_principal_async)):
+    cat = await get_category_async(db, user, category_id)
     if not cat:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category not found")
-    delete_category(db, user, cat)
+    await delete_category_async(db, user, cat)
     return None
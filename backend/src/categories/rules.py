@@ -0,0 +1,188 @@
+# src/categories/rules.py
+# Per-user categorization rules compiled into one matcher. All substring
+# patterns go into a single Aho-Corasick automaton, so one pass over a
+# merchant finds every rule whose substring occurs in it; rules are then
+# checked in priority order and the first one that fully matches wins.
+# Matchers are cached per user under the rules version kept in the database
+# (src/charts/versions.py), which every rule change bumps in its transaction,
+# so all processes pick up a change on their next import.
+#
+# The same rules run in SQL for re-applying them to stored transactions
+# (rules_category_case): substrings become ILIKE, regexes Postgres ~*. Python's
+# word-boundary escapes \b and \B are translated to Postgres' \y and \Y
+# (sql_regex); other syntax should stick to what both engines share.
+from __future__ import annotations
+import re
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from uuid import UUID
+
+from sqlalchemy import and_, case, or_, select
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import ColumnElement
+
+from src.categories.models import CategoryRule
+from src.charts.versions import get_rules_version
+from src.core.cache import get_cache
+from src.transactions.models import Transaction
+
+RULE_ORDER = (CategoryRule.priority.asc(), CategoryRule.created_at.asc(), CategoryRule.id.asc())
+
+class LiteralAutomaton:
+    # Aho-Corasick over lowercased substrings: one pass over a text finds every
+    # pattern that occurs in it, however many there are. Plain lists and dicts,
+    # so it pickles for shared cache backends.
+    def __init__(self, words: Dict[int, str]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.out: List[List[int]] = [[]]
+        for key, word in words.items():
+            node = 0
+            for ch in word:
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto.append({})
+                    self.out.append([])
+                    self.goto[node][ch] = nxt
+                node = nxt
+            self.out[node].append(key)
+        # failure links breadth-first; each node also reports the words that
+        # end at its failure target (suffixes of its own path)
+        self.fail = [0] * len(self.goto)
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self.goto[node].items():
+                queue.append(nxt)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def find(self, text: str) -> Set[int]:
+        goto, fail, out = self.goto, self.fail, self.out
+        hits: Set[int] = set()
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                hits.update(out[node])
+        return hits
+
+# (category_id, compiled regex, min_amount, max_amount, type)
+CompiledRule = Tuple[UUID, Optional[re.Pattern], Optional[float], Optional[float], Optional[str]]
+
+class RuleMatcher:
+    def __init__(self, rules: Iterable[CategoryRule]):
+        self.rules: List[CompiledRule] = []
+        literals: Dict[int, str] = {}
+        for i, rule in enumerate(rules):
+            regex = None
+            if rule.merchant_pattern and rule.merchant_regex:
+                regex = re.compile(rule.merchant_pattern, re.IGNORECASE)
+            elif rule.merchant_pattern:
+                literals[i] = rule.merchant_pattern.lower()
+            self.rules.append((rule.category_id, regex, rule.min_amount, rule.max_amount, rule.type))
+        self.literals = LiteralAutomaton(literals) if literals else None
+        # rules without a substring pattern are candidates for every row
+        self.always = [i for i in range(len(self.rules)) if i not in literals]
+
+    def match(self, merchant: Optional[str], amount: float, kind: str) -> Optional[UUID]:
+        # substring rules are candidates only when the automaton pass found
+        # them; a regex only runs when the priority scan gets to its rule
+        candidates = self.always
+        if merchant and self.literals:
+            hits = self.literals.find(merchant.lower())
+            if hits:
+                candidates = sorted(hits.union(self.always))
+        for i in candidates:
+            category_id, regex, min_amount, max_amount, rule_type = self.rules[i]
+            if rule_type is not None and rule_type != kind:
+                continue
+            if min_amount is not None and amount < min_amount:
+                continue
+            if max_amount is not None and amount > max_amount:
+                continue
+            if regex is not None and not (merchant and regex.search(merchant)):
+                continue
+            return category_id
+        return None
+
+    def categorize(self, values: Iterable[Dict]) -> None:
+        # fills category_id on insert values that do not have one yet
+        if not self.rules:
+            return
+        for v in values:
+            if v.get("category_id") is None:
+                v["category_id"] = self.match(v.get("merchant"), float(v["amount"]), v["type"])
+
+def load_rules(db: Session, user_id: UUID) -> List[CategoryRule]:
+    stmt = select(CategoryRule).where(CategoryRule.user_id == user_id).order_by(*RULE_ORDER)
+    return list(db.execute(stmt).scalars())
+
+def get_rule_matcher(db: Session, user_id: UUID) -> RuleMatcher:
+    cache = get_cache()
+    key = f"category_rules:{user_id}:{get_rules_version(db, user_id)}"
+    matcher = cache.get(key)
+    if matcher is None:
+        matcher = RuleMatcher(load_rules(db, user_id))
+        cache.set(key, matcher)
+    return matcher
+
+# Python escapes whose Postgres spelling differs; in Postgres \b is a backspace
+SQL_REGEX_ESCAPES = {"b": "y", "B": "Y"}
+
+def sql_regex(pattern: str) -> str:
+    # rewrites a Python regex for Postgres ~*. Inside a bracket expression \b
+    # is a backspace in both engines, so only escapes outside one are changed.
+    out: List[str] = []
+    i, n, in_class = 0, len(pattern), False
+    while i < n:
+        ch = pattern[i]
+        if ch == "\\" and i + 1 < n:
+            nxt = pattern[i + 1]
+            out.append("\\" + (nxt if in_class else SQL_REGEX_ESCAPES.get(nxt, nxt)))
+            i += 2
+            continue
+        if ch == "[" and not in_class:
+            in_class = True
+            out.append(ch)
+            i += 1
+            # a "]" right after "[" or "[^" is a literal member
+            if i < n and pattern[i] == "^":
+                out.append("^")
+                i += 1
+            if i < n and pattern[i] == "]":
+                out.append("]")
+                i += 1
+            continue
+        if ch == "]" and in_class:
+            in_class = False
+        out.append(ch)
+        i += 1
+    return "".join(out)
+
+def rule_condition(rule: CategoryRule) -> ColumnElement[bool]:
+    conditions = []
+    if rule.merchant_pattern:
+        if rule.merchant_regex:
+            conditions.append(Transaction.merchant.regexp_match(sql_regex(rule.merchant_pattern), flags="i"))
+        else:
+            conditions.append(Transaction.merchant.icontains(rule.merchant_pattern, autoescape=True))
+    if rule.type is not None:
+        conditions.append(Transaction.type == rule.type)
+    if rule.min_amount is not None:
+        conditions.append(Transaction.amount >= rule.min_amount)
+    if rule.max_amount is not None:
+        conditions.append(Transaction.amount <= rule.max_amount)
+    return and_(*conditions)
+
+def rules_category_case(rules: List[CategoryRule]) -> Tuple[ColumnElement, ColumnElement[bool]]:
+    # CASE picking the first matching rule's category, and the OR of all rule
+    # conditions for the WHERE clause
+    conditions = [rule_condition(r) for r in rules]
+    category = case(*((c, r.category_id) for c, r in zip(conditions, rules)), else_=None)
+    return category, or_(*conditions)
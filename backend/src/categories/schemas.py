@@ -1,8 +1,9 @@
 from __future__ import annotations
-from pydantic import BaseModel, Field, ConfigDict
+import re
+from pydantic import BaseModel, Field, ConfigDict, model_validator
 from uuid import UUID
 from datetime import datetime
-from typing import Optional, List
+from typing import Literal, Optional, List
 
 class CategoryCreate(BaseModel):
     name: str = Field(min_length=1, max_length=50)
@@ -16,3 +17,58 @@ class CategoryOut(BaseModel):
     user_id: UUID
     name: str
     created_at: datetime
+
+RuleType = Literal["income", "expense"]
+
+class CategoryRuleFields(BaseModel):
+    priority: int = 0
+    merchant_pattern: Optional[str] = Field(default=None, min_length=1, max_length=200)
+    merchant_regex: bool = False
+    min_amount: Optional[float] = Field(default=None, ge=0)
+    max_amount: Optional[float] = Field(default=None, ge=0)
+    type: Optional[RuleType] = None
+
+    @model_validator(mode="after")
+    def _check(self):
+        if self.merchant_regex and self.merchant_pattern:
+            try:
+                re.compile(self.merchant_pattern)
+            except re.error as e:
+                raise ValueError(f"invalid merchant_pattern regex: {e}")
+        if self.min_amount is not None and self.max_amount is not None and self.min_amount > self.max_amount:
+            raise ValueError("min_amount must be <= max_amount")
+        return self
+
+class CategoryRuleCreate(CategoryRuleFields):
+    category_id: UUID
+
+    @model_validator(mode="after")
+    def _has_condition(self):
+        if not self.merchant_pattern and self.min_amount is None and self.max_amount is None and self.type is None:
+            raise ValueError("a rule needs a merchant pattern, an amount bound or a type")
+        return self
+
+class CategoryRuleUpdate(BaseModel):
+    # partial update; the merged rule is validated again in the service
+    category_id: Optional[UUID] = None
+    priority: Optional[int] = None
+    merchant_pattern: Optional[str] = Field(default=None, min_length=1, max_length=200)
+    merchant_regex: Optional[bool] = None
+    min_amount: Optional[float] = Field(default=None, ge=0)
+    max_amount: Optional[float] = Field(default=None, ge=0)
+    type: Optional[RuleType] = None
+
+class CategoryRuleOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    id: UUID
+    category_id: UUID
+    priority: int
+    merchant_pattern: Optional[str]
+    merchant_regex: bool
+    min_amount: Optional[float]
+    max_amount: Optional[float]
+    type: Optional[str]
+    created_at: datetime
+
+class RuleApplyResult(BaseModel):
+    updated: int
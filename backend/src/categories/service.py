@@ -1,14 +1,26 @@
-from sqlalchemy import select
+from pydantic import ValidationError
+from sqlalchemy import literal, select, update
+from sqlalchemy.exc import DataError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from typing import List
 from uuid import UUID
 
-from src.categories.models import Category
-from src.categories.schemas import CategoryCreate, CategoryUpdate
+from src.categories.models import Category, CategoryRule
+from src.categories.rules import RULE_ORDER, load_rules, rules_category_case, sql_regex
+from src.categories.schemas import (
+    CategoryCreate, CategoryUpdate, CategoryRuleCreate, CategoryRuleUpdate,
+)
 from src.auth.models import User
+from src.charts.rollup import apply_rollup_deltas, rollup_deltas
+from src.charts.versions import bump_data_version, bump_rules_version
+from src.core.exceptions import InvalidCategoryRule
+from src.transactions.models import Transaction
 
 def create_category(db: Session, user: User, payload: CategoryCreate) -> Category:
     cat = Category(user_id=user.id, name=payload.name)
     db.add(cat)
+    bump_data_version(db, user.id)
     db.commit()
     db.refresh(cat)
     return cat
@@ -25,10 +37,152 @@ def update_category(db: Session, user: User, category: Category, payload: Catego
     for field, value in payload.model_dump(exclude_unset=True).items():
         setattr(category, field, value)
     db.add(category)
+    bump_data_version(db, user.id)
     db.commit()
     db.refresh(category)
     return category
 
 def delete_category(db: Session, user: User, category: Category) -> None:
     db.delete(category)
+    bump_data_version(db, user.id)
+    bump_rules_version(db, user.id)  # its rules are gone with it
     db.commit()
+
+# Categorization rules. Every change bumps the rules version in its own
+# transaction, so cached matchers (src/categories/rules.py) are rebuilt on next use.
+
+def _check_regex(db: Session, rule: CategoryRule) -> None:
+    # the schema compiles regexes with Python's re, but apply_rules runs them
+    # as Postgres ~* (after sql_regex), which rejects some of its syntax (named
+    # groups, lookbehind)
+    if not (rule.merchant_regex and rule.merchant_pattern):
+        return
+    try:
+        with db.begin_nested():
+            db.execute(select(literal("").regexp_match(sql_regex(rule.merchant_pattern), flags="i")))
+    except DataError as e:
+        raise InvalidCategoryRule(f"invalid merchant_pattern regex: {e.orig}")
+
+def create_rule(db: Session, user: User, payload: CategoryRuleCreate) -> CategoryRule:
+    rule = CategoryRule(user_id=user.id, **payload.model_dump())
+    _check_regex(db, rule)
+    db.add(rule)
+    bump_rules_version(db, user.id)
+    db.commit()
+    db.refresh(rule)
+    return rule
+
+def list_rules(db: Session, user: User) -> List[CategoryRule]:
+    return load_rules(db, user.id)
+
+def get_rule(db: Session, user: User, rule_id: UUID) -> CategoryRule | None:
+    stmt = select(CategoryRule).where(CategoryRule.id == rule_id, CategoryRule.user_id == user.id)
+    return db.execute(stmt).scalars().first()
+
+def update_rule(db: Session, user: User, rule: CategoryRule, payload: CategoryRuleUpdate) -> CategoryRule:
+    changes = payload.model_dump(exclude_unset=True)
+    merged = {f: getattr(rule, f) for f in CategoryRuleCreate.model_fields} | changes
+    try:
+        CategoryRuleCreate.model_validate(merged)
+    except ValidationError as e:
+        raise InvalidCategoryRule("; ".join(err["msg"] for err in e.errors()))
+    for field, value in changes.items():
+        setattr(rule, field, value)
+    _check_regex(db, rule)
+    db.add(rule)
+    bump_rules_version(db, user.id)
+    db.commit()
+    db.refresh(rule)
+    return rule
+
+def delete_rule(db: Session, user: User, rule: CategoryRule) -> None:
+    db.delete(rule)
+    bump_rules_version(db, user.id)
+    db.commit()
+
+def apply_rules(db: Session, user: User, only_uncategorized: bool = True) -> int:
+    # One UPDATE for all rules: a CASE in rule order picks the category, rows
+    # whose category would not change are left alone. The old category comes
+    # from the FROM subquery (RETURNING only sees new values), so the rollups
+    # are adjusted by deltas in the same transaction instead of rebuilt.
+    rules = load_rules(db, user.id)
+    if not rules:
+        return 0
+    category, matches = rules_category_case(rules)
+    changes = (
+        select(
+            Transaction.id, Transaction.occurred_at,
+            Transaction.category_id.label("old_category_id"), category.label("new_category_id"),
+        )
+        .where(Transaction.user_id == user.id, matches, Transaction.category_id.is_distinct_from(category))
+    )
+    if only_uncategorized:
+        changes = changes.where(Transaction.category_id.is_(None))
+    changes = changes.subquery("changes")
+    stmt = (
+        update(Transaction)
+        .where(
+            Transaction.id == changes.c.id,
+            Transaction.occurred_at == changes.c.occurred_at,
+            Transaction.user_id == user.id,
+            # a row recategorized concurrently is skipped, not double-counted
+            Transaction.category_id.is_not_distinct_from(changes.c.old_category_id),
+        )
+        .values(category_id=changes.c.new_category_id)
+        .returning(Transaction.occurred_at, changes.c.old_category_id, Transaction.category_id, Transaction.type, Transaction.amount)
+        .execution_options(synchronize_session=False)
+    )
+    try:
+        rows = db.execute(stmt).all()
+    except DataError as e:
+        # a regex saved before rules were checked against Postgres
+        db.rollback()
+        raise InvalidCategoryRule(f"a merchant_pattern regex is not valid in the database: {e.orig}")
+    if rows:
+        deltas = rollup_deltas([])
+        for r in rows:
+            rollup_deltas([(r.occurred_at, r.old_category_id, r.type, r.amount)], sign=-1, into=deltas)
+            rollup_deltas([(r.occurred_at, r.category_id, r.type, r.amount)], into=deltas)
+        apply_rollup_deltas(db, user.id, deltas)
+        bump_data_version(db, user.id)
+    db.commit()
+    return len(rows)
+
+# Async variants for routes on the AsyncSession
+
+async def create_category_async(db: AsyncSession, user: User, payload: CategoryCreate) -> Category:
+    return await db.run_sync(create_category, user, payload)
+
+async def list_categories_async(db: AsyncSession, user: User):
+    stmt = select(Category).where(Category.user_id == user.id).order_by(Category.name.asc())
+    return (await db.execute(stmt)).scalars().all()
+
+async def get_category_async(db: AsyncSession, user: User, category_id: UUID) -> Category | None:
+    stmt = select(Category).where(Category.id == category_id, Category.user_id == user.id)
+    return (await db.execute(stmt)).scalars().first()
+
+async def update_category_async(db: AsyncSession, user: User, category: Category, payload: CategoryUpdate) -> Category:
+    return await db.run_sync(update_category, user, category, payload)
+
+async def delete_category_async(db: AsyncSession, user: User, category: Category) -> None:
+    await db.run_sync(delete_category, user, category)
+
+async def create_rule_async(db: AsyncSession, user: User, payload: CategoryRuleCreate) -> CategoryRule:
+    return await db.run_sync(create_rule, user, payload)
+
+async def list_rules_async(db: AsyncSession, user: User) -> List[CategoryRule]:
+    stmt = select(CategoryRule).where(CategoryRule.user_id == user.id).order_by(*RULE_ORDER)
+    return (await db.execute(stmt)).scalars().all()
+
+async def get_rule_async(db: AsyncSession, user: User, rule_id: UUID) -> CategoryRule | None:
+    stmt = select(CategoryRule).where(CategoryRule.id == rule_id, CategoryRule.user_id == user.id)
+    return (await db.execute(stmt)).scalars().first()
+
+async def update_rule_async(db: AsyncSession, user: User, rule: CategoryRule, payload: CategoryRuleUpdate) -> CategoryRule:
+    return await db.run_sync(update_rule, user, rule, payload)
+
+async def delete_rule_async(db: AsyncSession, user: User, rule: CategoryRule) -> None:
+    await db.run_sync(delete_rule, user, rule)
+
+async def apply_rules_async(db: AsyncSession, user: User, only_uncategorized: bool = True) -> int:
+    return await db.run_sync(apply_rules, user, only_uncategorized)
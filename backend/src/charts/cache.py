@@ -0,0 +1,45 @@
+# src/charts/cache.py
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict
+
+from fastapi import Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.cache import get_cache
+from src.charts.versions import get_data_version
+from src.core.config import settings
+from src.auth.schemas import Principal
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [t.strip().removeprefix("W/") for t in header.split(",")]
+    return "*" in tags or etag in tags
+
+async def cached_chart(
+    request: Request,
+    response: Response,
+    db: AsyncSession,
+    user: Principal,
+    endpoint: str,
+    params: Dict[str, Any],
+    compute: Callable[[], Awaitable[Any]],
+):
+    # keyed by the user's data version, read from the database on every request,
+    # so a write from any process invalidates the ETag and every cached chart
+    version = await db.run_sync(get_data_version, user.id)
+    key = f"chart:{user.id}:{version}:{endpoint}:{json.dumps(params, sort_keys=True, default=str)}"
+    etag = '"' + hashlib.sha1(key.encode()).hexdigest() + '"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    cache = get_cache()
+    result = cache.get(key)
+    if result is None:
+        result = await compute()
+        cache.set(key, result, ttl=settings.CHART_CACHE_TTL_SECONDS)
+    response.headers.update(headers)
+    return result
@@ -0,0 +1,33 @@
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import ForeignKey, Index, text
+from src.db.base import Base
+import uuid
+from datetime import date
+
+# NULL category ("Uncategorized") as a comparable key for the unique index / upserts
+CATEGORY_KEY = "coalesce(category_id, '00000000-0000-0000-0000-000000000000'::uuid)"
+
+class DailyRollup(Base):
+    # per-day sums of transactions; kept in step by src/charts/rollup.py
+    __tablename__ = "daily_rollups"
+    id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid.uuid4, server_default=text("gen_random_uuid()"))
+    user_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
+    day: Mapped[date]
+    category_id: Mapped[uuid.UUID | None] = mapped_column(ForeignKey("categories.id", ondelete="CASCADE"))
+    type: Mapped[str]
+    total: Mapped[float] = mapped_column(default=0)
+    tx_count: Mapped[int] = mapped_column(default=0)
+
+    __table_args__ = (
+        Index("ux_daily_rollups_key", "user_id", "day", "type", text(CATEGORY_KEY), unique=True),
+    )
+
+class DataVersion(Base):
+    # per-user counters bumped in the same transaction as the writes they
+    # describe (src/charts/versions.py): version for anything a chart shows,
+    # which chart cache keys and ETags embed; rules_version for the
+    # categorization rules, which cached rule matchers are keyed by
+    __tablename__ = "data_versions"
+    user_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    version: Mapped[int] = mapped_column(default=0, server_default=text("0"))
+    rules_version: Mapped[int] = mapped_column(default=0, server_default=text("0"))
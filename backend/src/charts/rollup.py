@@ -0,0 +1,104 @@
+# src/charts/rollup.py
+# Maintains daily_rollups alongside writes to transactions.
+# Backfill / repair: python -m src.charts.rollup [--user USER_ID]
+from __future__ import annotations
+import argparse
+import logging
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import select, delete, func, cast, Date, literal_column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from src.charts.models import DailyRollup, CATEGORY_KEY
+from src.core.dates import to_db_time
+from src.transactions.models import Transaction
+
+logger = logging.getLogger("app")
+
+RollupKey = Tuple[date, Optional[UUID], str]  # (day, category_id, type)
+RollupDeltas = Dict[RollupKey, List]  # key -> [total, tx_count]
+
+def rollup_deltas(
+    rows: Iterable[Tuple[datetime, Optional[UUID], str, float]],
+    sign: int = 1,
+    into: Optional[RollupDeltas] = None,
+) -> RollupDeltas:
+    # rows are (occurred_at, category_id, type, amount); sign=-1 for removals.
+    # Days are taken in the database time zone, like cast(occurred_at, Date)
+    # in rebuild_rollups, also for aware values not yet reloaded from the row
+    deltas = into if into is not None else defaultdict(lambda: [0.0, 0])
+    for occurred_at, category_id, kind, amount in rows:
+        d = deltas[(to_db_time(occurred_at).date(), category_id, kind)]
+        d[0] += sign * float(amount)
+        d[1] += sign
+    return deltas
+
+def tx_rollup_row(tx: Transaction) -> Tuple[datetime, Optional[UUID], str, float]:
+    return tx.occurred_at, tx.category_id, tx.type, tx.amount
+
+def apply_rollup_deltas(db: Session, user_id: UUID, deltas: RollupDeltas) -> None:
+    # Runs inside the caller's transaction so the rollup commits (or rolls back)
+    # together with the rows it describes.
+    values = [
+        {"user_id": user_id, "day": day, "category_id": category_id, "type": kind, "total": total, "tx_count": count}
+        # fixed key order keeps concurrent writers from deadlocking on the upsert
+        for (day, category_id, kind), (total, count) in sorted(deltas.items(), key=lambda kv: (kv[0][0], str(kv[0][1]), kv[0][2]))
+        if count or total
+    ]
+    if not values:
+        return
+    stmt = pg_insert(DailyRollup).values(values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DailyRollup.user_id, DailyRollup.day, DailyRollup.type, literal_column(CATEGORY_KEY)],
+        set_={
+            "total": DailyRollup.total + stmt.excluded.total,
+            "tx_count": DailyRollup.tx_count + stmt.excluded.tx_count,
+        },
+    )
+    db.execute(stmt)
+    if any(v["tx_count"] < 0 for v in values):
+        db.execute(delete(DailyRollup).where(DailyRollup.user_id == user_id, DailyRollup.tx_count <= 0))
+
+def rebuild_rollups(db: Session, user_id: Optional[UUID] = None) -> None:
+    # recompute from the fact table; one user or everyone
+    clear = delete(DailyRollup)
+    source = select(
+        Transaction.user_id,
+        cast(Transaction.occurred_at, Date),
+        Transaction.category_id,
+        Transaction.type,
+        func.sum(Transaction.amount),
+        func.count(),
+    )
+    if user_id is not None:
+        clear = clear.where(DailyRollup.user_id == user_id)
+        source = source.where(Transaction.user_id == user_id)
+    source = source.group_by(
+        Transaction.user_id, cast(Transaction.occurred_at, Date), Transaction.category_id, Transaction.type
+    )
+    db.execute(clear)
+    db.execute(
+        pg_insert(DailyRollup).from_select(
+            ["user_id", "day", "category_id", "type", "total", "tx_count"], source
+        )
+    )
+
+if __name__ == "__main__":
+    from src.db.session import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Rebuild daily_rollups from transactions")
+    parser.add_argument("--user", type=UUID, default=None, help="only rebuild this user's rollups")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    from src.charts.versions import bump_data_version
+
+    with SessionLocal() as db:
+        rebuild_rollups(db, args.user)
+        # repaired rollups can change charts, so cached ones must go
+        bump_data_version(db, args.user)
+        db.commit()
+    logger.info("daily rollups rebuilt" + (f" for {args.user}" if args.user else ""))
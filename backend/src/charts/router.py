@@ -1,31 +1,43 @@
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 from typing import Optional, Literal
 
-from src.db.session import get_db
-from src.auth.service import get_current_user
-from src.auth.models import User
-from src.charts.service import expenses_by_category, spend_trend
+from src.db.session import get_async_db
+from src.auth.service import get_current_principal_async
+from src.auth.schemas import Principal
+from src.charts.service import expenses_by_category_async, spend_trend_async
+from src.charts.cache import cached_chart
 
 router = APIRouter(prefix="/charts", tags=["charts"])
 
 @router.get("/expenses-by-category")
-def chart_expenses_by_category(
+async def chart_expenses_by_category(
+    request: Request,
+    response: Response,
     start: Optional[datetime] = Query(default=None),
     end: Optional[datetime] = Query(default=None),
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    user: Principal = Depends(get_current_principal_async),
 ):
-    return expenses_by_category(db, user, start, end)
+    return await cached_chart(
+        request, response, db, user, "expenses-by-category", {"start": start, "end": end},
+        lambda: expenses_by_category_async(db, user, start, end),
+    )
 
 @router.get("/spend-trend")
-def chart_spend_trend(
+async def chart_spend_trend(
+    request: Request,
+    response: Response,
     granularity: Literal["day","month"] = Query(default="month"),
     kind: Literal["expense","income"] = Query(default="expense"),
     start: Optional[datetime] = Query(default=None),
     end: Optional[datetime] = Query(default=None),
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    user: Principal = Depends(get_current_principal_async),
 ):
-    return spend_trend(db, user, granularity, start, end, kind)
+    return await cached_chart(
+        request, response, db, user, "spend-trend",
+        {"granularity": granularity, "kind": kind, "start": start, "end": end},
+        lambda: spend_trend_async(db, user, granularity, start, end, kind),
+    )
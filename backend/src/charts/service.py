@@ -1,22 +1,46 @@
-from sqlalchemy import select, func
+from sqlalchemy import Select, select, func, cast, DateTime
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from datetime import datetime
-from typing import Literal, Optional
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Literal, Optional, Tuple
 
 from src.transactions.models import Transaction
 from src.categories.models import Category
+from src.charts.models import DailyRollup
 from src.auth.models import User
+from src.core.dates import to_db_time
 
 Granularity = Literal["day", "month"]
 
-def expenses_by_category(
-    db: Session,
-    user: User,
-    start: Optional[datetime] = None,
-    end: Optional[datetime] = None,
-):
+# Whole days inside [start, end] are read from daily_rollups; only the partial
+# days at either edge (when a bound has a time of day) touch the raw table.
+# Aware bounds are first made naive in the database time zone, the zone the
+# rollup days are cut in.
+
+def _full_days(start: Optional[datetime], end: Optional[datetime]) -> Tuple[Optional[date], Optional[date]]:
+    # [first, last) range of days lying entirely within [start, end]
+    first = None
+    if start is not None:
+        first = start.date() if start.time() == time.min else start.date() + timedelta(days=1)
+    last = end.date() if end is not None else None
+    return first, last
+
+def _edge_ranges(start: Optional[datetime], end: Optional[datetime], first: Optional[date], last: Optional[date]):
+    # raw-table ranges not covered by the rollup days; both bounds inclusive
+    ranges = []
+    if start is not None and start.time() != time.min:
+        ranges.append((start, min(datetime.combine(first, time.min) - timedelta(microseconds=1), end or datetime.max)))
+    if end is not None:
+        ranges.append((max(datetime.combine(last, time.min), start or datetime.min), end))
+    return ranges
+
+# Statement builders are separate from execution so the partition pruning check
+# (src/transactions/partitions.py) can EXPLAIN exactly what the charts run.
+
+def expense_transactions_stmt(user: User, start: datetime, end: datetime) -> Select:
     # LEFT JOIN to include uncategorized
-    stmt = (
+    return (
         select(
             func.coalesce(Category.name, "Uncategorized").label("label"),
             func.sum(Transaction.amount).label("value"),
@@ -25,43 +49,141 @@ def expenses_by_category(
         .join(Category, Category.id == Transaction.category_id, isouter=True)
         .where(Transaction.user_id == user.id)
         .where(Transaction.type == "expense")
+        .where(Transaction.occurred_at >= start)
+        .where(Transaction.occurred_at <= end)
+        .group_by("label")
     )
-    if start:
-        stmt = stmt.where(Transaction.occurred_at >= start)
-    if end:
-        stmt = stmt.where(Transaction.occurred_at <= end)
-
-    stmt = stmt.group_by("label").order_by(func.sum(Transaction.amount).desc())
-    rows = db.execute(stmt).all()
-    labels = [r.label for r in rows]
-    data = [float(r.value or 0) for r in rows]
-    return {"labels": labels, "datasets": [{"label": "Expenses by Category", "data": data}]}
 
-def spend_trend(
+def _expense_rows_from_transactions(db: Session, user: User, start: datetime, end: datetime):
+    return db.execute(expense_transactions_stmt(user, start, end)).all()
+
+def expense_rollup_stmt(user: User, first: Optional[date], last: Optional[date]) -> Select:
+    stmt = (
+        select(
+            func.coalesce(Category.name, "Uncategorized").label("label"),
+            func.sum(DailyRollup.total).label("value"),
+        )
+        .select_from(DailyRollup)
+        .join(Category, Category.id == DailyRollup.category_id, isouter=True)
+        .where(DailyRollup.user_id == user.id)
+        .where(DailyRollup.type == "expense")
+    )
+    if first:
+        stmt = stmt.where(DailyRollup.day >= first)
+    if last:
+        stmt = stmt.where(DailyRollup.day < last)
+    return stmt.group_by("label")
+
+def _expense_rows_from_rollup(db: Session, user: User, first: Optional[date], last: Optional[date]):
+    return db.execute(expense_rollup_stmt(user, first, last)).all()
+
+def expenses_by_category(
     db: Session,
     user: User,
-    granularity: Granularity = "month",
     start: Optional[datetime] = None,
     end: Optional[datetime] = None,
-    kind: Literal["expense", "income"] = "expense",
 ):
+    start, end = to_db_time(start), to_db_time(end)
+    totals: Dict[str, float] = defaultdict(float)
+    first, last = _full_days(start, end)
+    if first is None or last is None or first < last:
+        rows = list(_expense_rows_from_rollup(db, user, first, last))
+        for lo, hi in _edge_ranges(start, end, first, last):
+            rows += _expense_rows_from_transactions(db, user, lo, hi)
+    elif start <= end:
+        rows = _expense_rows_from_transactions(db, user, start, end)
+    else:
+        rows = []
+    for r in rows:
+        totals[r.label] += float(r.value or 0)
+
+    ordered = sorted(totals.items(), key=lambda kv: kv[1], reverse=True)
+    labels = [label for label, _ in ordered]
+    data = [value for _, value in ordered]
+    return {"labels": labels, "datasets": [{"label": "Expenses by Category", "data": data}]}
+
+def trend_transactions_stmt(user: User, granularity: Granularity, kind: str, start: datetime, end: datetime) -> Select:
     dt = func.date_trunc(granularity, Transaction.occurred_at).label("period")
-    stmt = (
+    return (
         select(
             dt,
             func.sum(Transaction.amount).label("value"),
         )
         .where(Transaction.user_id == user.id)
         .where(Transaction.type == kind)
+        .where(Transaction.occurred_at >= start)
+        .where(Transaction.occurred_at <= end)
+        .group_by(dt)
     )
-    if start:
-        stmt = stmt.where(Transaction.occurred_at >= start)
-    if end:
-        stmt = stmt.where(Transaction.occurred_at <= end)
-
-    stmt = stmt.group_by(dt).order_by(dt.asc())
-    rows = db.execute(stmt).all()
-    labels = [r.period.isoformat() for r in rows]
-    data = [float(r.value or 0) for r in rows]
+
+def _trend_rows_from_transactions(db: Session, user: User, granularity: Granularity, kind: str, start: datetime, end: datetime):
+    return db.execute(trend_transactions_stmt(user, granularity, kind, start, end)).all()
+
+def trend_rollup_stmt(user: User, granularity: Granularity, kind: str, first: Optional[date], last: Optional[date]) -> Select:
+    # cast so date_trunc returns a plain timestamp, same as on occurred_at
+    dt = func.date_trunc(granularity, cast(DailyRollup.day, DateTime)).label("period")
+    stmt = (
+        select(
+            dt,
+            func.sum(DailyRollup.total).label("value"),
+        )
+        .where(DailyRollup.user_id == user.id)
+        .where(DailyRollup.type == kind)
+    )
+    if first:
+        stmt = stmt.where(DailyRollup.day >= first)
+    if last:
+        stmt = stmt.where(DailyRollup.day < last)
+    return stmt.group_by(dt)
+
+def _trend_rows_from_rollup(db: Session, user: User, granularity: Granularity, kind: str, first: Optional[date], last: Optional[date]):
+    return db.execute(trend_rollup_stmt(user, granularity, kind, first, last)).all()
+
+def spend_trend(
+    db: Session,
+    user: User,
+    granularity: Granularity = "month",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    kind: Literal["expense", "income"] = "expense",
+):
+    start, end = to_db_time(start), to_db_time(end)
+    totals: Dict[datetime, float] = defaultdict(float)
+    first, last = _full_days(start, end)
+    if first is None or last is None or first < last:
+        rows = list(_trend_rows_from_rollup(db, user, granularity, kind, first, last))
+        for lo, hi in _edge_ranges(start, end, first, last):
+            rows += _trend_rows_from_transactions(db, user, granularity, kind, lo, hi)
+    elif start <= end:
+        rows = _trend_rows_from_transactions(db, user, granularity, kind, start, end)
+    else:
+        rows = []
+    for r in rows:
+        totals[r.period] += float(r.value or 0)
+
+    periods = sorted(totals)
+    labels = [p.isoformat() for p in periods]
+    data = [totals[p] for p in periods]
     title = f"{kind.title()} Trend ({granularity})"
     return {"labels": labels, "datasets": [{"label": title, "data": data}]}
+
+# Async variants for routes on the AsyncSession; the rollup/edge-day merging
+# above runs unchanged through run_sync
+
+async def expenses_by_category_async(
+    db: AsyncSession,
+    user: User,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+):
+    return await db.run_sync(expenses_by_category, user, start, end)
+
+async def spend_trend_async(
+    db: AsyncSession,
+    user: User,
+    granularity: Granularity = "month",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    kind: Literal["expense", "income"] = "expense",
+):
+    return await db.run_sync(spend_trend, user, granularity, start, end, kind)
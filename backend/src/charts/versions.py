@@ -0,0 +1,42 @@
+# src/charts/versions.py
+# Per-user versions live in the database rather than the cache, so a write
+# from any process (API workers, the receipt worker, the rollup CLI) changes
+# the version every process reads. The bumps run in the writer's transaction:
+# a new version becomes visible exactly when the rows do. "version" covers
+# chart data, "rules_version" the categorization rules.
+from __future__ import annotations
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from src.auth.models import User
+from src.charts.models import DataVersion
+
+def _get(db: Session, user_id: UUID, column: str) -> int:
+    return db.scalar(select(getattr(DataVersion, column)).where(DataVersion.user_id == user_id)) or 0
+
+def _bump(db: Session, user_id: Optional[UUID], column: str) -> None:
+    # call before the commit that writes the data; None bumps every user
+    source = select(User.id, 1)
+    if user_id is not None:
+        source = source.where(User.id == user_id)
+    stmt = pg_insert(DataVersion).from_select(["user_id", column], source)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[DataVersion.user_id],
+        set_={column: getattr(DataVersion, column) + 1},
+    ))
+
+def get_data_version(db: Session, user_id: UUID) -> int:
+    return _get(db, user_id, "version")
+
+def bump_data_version(db: Session, user_id: Optional[UUID]) -> None:
+    _bump(db, user_id, "version")
+
+def get_rules_version(db: Session, user_id: UUID) -> int:
+    return _get(db, user_id, "rules_version")
+
+def bump_rules_version(db: Session, user_id: UUID) -> None:
+    _bump(db, user_id, "rules_version")
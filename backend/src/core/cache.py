@@ -0,0 +1,91 @@
+# src/core/cache.py
+# Small key/value cache used for chart responses, verified tokens and rule
+# matchers. Chart entries are keyed by data versions kept in the database
+# (src/charts/versions.py), so every process sees a write at once; versions
+# kept here only reach other processes through the shared backend below, and
+# entries keyed by them rely on their TTL otherwise.
+# The in-process backend is per worker process; deployments running several
+# processes should point CACHE_BACKEND at a shared implementation
+# ("package.module:ClassName" with the CacheBackend methods).
+from __future__ import annotations
+import abc
+import importlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Optional
+
+from src.core.config import settings
+
+class CacheBackend(abc.ABC):
+    @abc.abstractmethod
+    def get(self, key: str) -> Any:
+        ...
+
+    @abc.abstractmethod
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ...
+
+    @abc.abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+class InProcessCache(CacheBackend):
+    # bounded LRU with optional per-entry expiry
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._data: OrderedDict[str, tuple[Optional[float], Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+_backend: Optional[CacheBackend] = None
+
+def get_cache() -> CacheBackend:
+    global _backend
+    if _backend is None:
+        if settings.CACHE_BACKEND == "memory":
+            _backend = InProcessCache(settings.CACHE_MAX_ENTRIES)
+        else:
+            module_name, _, class_name = settings.CACHE_BACKEND.partition(":")
+            _backend = getattr(importlib.import_module(module_name), class_name)()
+    return _backend
+
+# A version is an opaque token replaced on every change, so cache entries that
+# embed it go stale at once. A missing (evicted/expired) token just gets a
+# fresh one, which can only cause misses, never stale hits.
+
+def get_version(scope: str) -> str:
+    cache = get_cache()
+    key = f"version:{scope}"
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.set(key, version)
+    return version
+
+def bump_version(scope: str) -> None:
+    get_cache().set(f"version:{scope}", uuid.uuid4().hex)
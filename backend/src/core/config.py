@@ -6,6 +6,67 @@ class Settings(BaseSettings):
     JWT_ALG: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
 
+    # connection pool, per engine (sync and async each keep their own)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    # session TimeZone of every connection; naive timestamps (occurred_at,
+    # rollup days) are wall-clock times in this zone
+    DB_TIMEZONE: str = "UTC"
+
+    # uploads are streamed to disk in chunks and rejected past this size
+    MAX_UPLOAD_BYTES: int = 20 * 1024 * 1024
+
+    # OCR engine: "auto" uses the tesserocr bindings when installed, else pytesseract;
+    # tesserocr keeps up to OCR_ENGINE_HANDLES loaded API handles per process (0 = CPU count)
+    OCR_ENGINE: str = "auto"
+    OCR_ENGINE_HANDLES: int = 0
+
+    # a receipt gets extra OCR passes (up to OCR_MAX_PASSES in total) only while
+    # mean word confidence is below OCR_MIN_CONFIDENCE or no amount/date is found
+    OCR_MIN_CONFIDENCE: float = 70.0
+    OCR_MAX_PASSES: int = 4
+
+    # receipt images are rescaled so glyphs are about this many pixels tall
+    OCR_TARGET_TEXT_HEIGHT: int = 32
+
+    # scanned (image-only) PDF receipts are rasterized per page for OCR
+    OCR_PDF_DPI: int = 300
+    OCR_PDF_MAX_PAGES: int = 50
+
+    # multi-file receipt uploads: files per request, and receipts OCR'd at once
+    RECEIPT_BATCH_MAX_FILES: int = 50
+    RECEIPT_BATCH_CONCURRENCY: int = 4
+
+    # receipt OCR queue (see src/uploads/worker.py)
+    RECEIPT_WORKER_POLL_SECONDS: float = 2.0
+    RECEIPT_JOB_LEASE_SECONDS: int = 300
+    RECEIPT_JOB_MAX_ATTEMPTS: int = 3
+
+    # CPU-bound parsing (statement pages); 0 = one process per core
+    PROCESS_POOL_WORKERS: int = 0
+
+    # rows per INSERT/savepoint/checkpoint when committing an import
+    IMPORT_CHUNK_SIZE: int = 1000
+
+    # rows fetched per server-side cursor round trip when exporting transactions
+    EXPORT_BATCH_ROWS: int = 1000
+
+    # transactions partitioning (src/transactions/partitions.py): monthly
+    # partitions created this many months ahead, each optionally split into
+    # HASH(user_id) sub-partitions (0 = no sub-partitioning)
+    TRANSACTIONS_PARTITIONS_AHEAD: int = 3
+    TRANSACTIONS_HASH_PARTITIONS: int = 0
+
+    # chart response cache (see src/core/cache.py)
+    CACHE_BACKEND: str = "memory"
+    CACHE_MAX_ENTRIES: int = 10000
+    CHART_CACHE_TTL_SECONDS: int = 300
+
+    # verified token -> principal cache; 0 disables it
+    AUTH_CACHE_TTL_SECONDS: int = 60
+
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
 settings = Settings()
@@ -0,0 +1,21 @@
+# src/core/dates.py
+from __future__ import annotations
+from datetime import datetime
+from functools import lru_cache
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+from src.core.config import settings
+
+@lru_cache(maxsize=1)
+def _db_zone() -> ZoneInfo:
+    return ZoneInfo(settings.DB_TIMEZONE)
+
+def to_db_time(dt: Optional[datetime]) -> Optional[datetime]:
+    # occurred_at is a timestamp without time zone; Postgres compares an aware
+    # parameter against it (and stores one) in the session TimeZone, which the
+    # engines pin to DB_TIMEZONE. Aware values become naive in that zone so
+    # Python-side day arithmetic agrees with the database.
+    if dt is None or dt.tzinfo is None:
+        return dt
+    return dt.astimezone(_db_zone()).replace(tzinfo=None)
@@ -22,6 +22,26 @@ class ImportParseError(AppError):
     status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
     code = "import_parse_error"
 
+class InvalidCursorError(AppError):
+    status_code = status.HTTP_400_BAD_REQUEST
+    code = "invalid_cursor"
+
+class UploadTooLarge(AppError):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    code = "upload_too_large"
+
+class TooManyFiles(AppError):
+    status_code = status.HTTP_400_BAD_REQUEST
+    code = "too_many_files"
+
+class ReceiptExtractionError(AppError):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    code = "receipt_extraction_error"
+
+class InvalidCategoryRule(AppError):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    code = "invalid_category_rule"
+
 def install_domain_exception_handlers(app):
     @app.exception_handler(AppError)
     async def app_error_handler(request, exc: AppError):
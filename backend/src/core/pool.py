@@ -0,0 +1,26 @@
+# src/core/pool.py
+import atexit
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from src.core.config import settings
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def get_process_pool() -> ProcessPoolExecutor:
+    # shared pool for CPU-bound work (camelot, OCR) so request threads stay free;
+    # spawn avoids forking a process that already runs server threads, and the
+    # lock keeps concurrent first callers from each starting a pool
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(
+                    max_workers=settings.PROCESS_POOL_WORKERS or None,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+                atexit.register(_pool.shutdown, wait=False, cancel_futures=True)
+    return _pool
@@ -1,10 +1,25 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from src.core.config import settings
 
-engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
+pool_options = dict(
+    pool_pre_ping=True,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    # aware datetimes are converted with the same zone (src/core/dates.py)
+    connect_args={"options": f"-c timezone={settings.DB_TIMEZONE}"},
+)
+
+engine = create_engine(settings.DATABASE_URL, **pool_options)
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 
+# psycopg 3 serves both engines from the same postgresql+psycopg:// URL
+async_engine = create_async_engine(settings.DATABASE_URL, **pool_options)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
 # Dependency for FastAPI routes
 def get_db():
     db = SessionLocal()
@@ -12,3 +27,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Dependency for async routes
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,17 @@
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import JSONB
+from src.db.base import Base
+from datetime import datetime
+
+class ExtractionResult(Base):
+    # output of an extractor (OCR, statement parser) for one blob; a new
+    # extractor version simply misses, older rows stay until pruned
+    __tablename__ = "extraction_results"
+    sha256: Mapped[str] = mapped_column(primary_key=True)
+    extractor: Mapped[str] = mapped_column(primary_key=True)  # e.g. 'receipt_text', 'history_pdf_rows'
+    version: Mapped[str] = mapped_column(primary_key=True)
+    text: Mapped[str | None]
+    rows: Mapped[list | None] = mapped_column(JSONB)
+    meta: Mapped[dict | None] = mapped_column(JSONB)  # extractor details, e.g. OCR passes/confidence
+    created_at: Mapped[datetime] = mapped_column(server_default=text("now()"))
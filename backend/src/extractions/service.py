@@ -0,0 +1,64 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from src.extractions.models import ExtractionResult
+
+def get_extraction(db: Session, sha256: Optional[str], extractor: str, version: str) -> Optional[ExtractionResult]:
+    if not sha256:
+        return None
+    stmt = select(ExtractionResult).where(
+        ExtractionResult.sha256 == sha256,
+        ExtractionResult.extractor == extractor,
+        ExtractionResult.version == version,
+    )
+    return db.execute(stmt).scalars().first()
+
+def get_extractions(db: Session, sha256s: Iterable[str], extractor: str, version: str) -> Dict[str, ExtractionResult]:
+    digests = {s for s in sha256s if s}
+    if not digests:
+        return {}
+    stmt = select(ExtractionResult).where(
+        ExtractionResult.sha256.in_(digests),
+        ExtractionResult.extractor == extractor,
+        ExtractionResult.version == version,
+    )
+    return {r.sha256: r for r in db.execute(stmt).scalars()}
+
+def put_extraction(
+    db: Session,
+    sha256: Optional[str],
+    extractor: str,
+    version: str,
+    text: Optional[str] = None,
+    rows: Optional[List[Dict]] = None,
+    meta: Optional[Dict] = None,
+) -> None:
+    # written in the caller's transaction and committed with its next commit
+    if not sha256:
+        return
+    stmt = pg_insert(ExtractionResult).values(
+        sha256=sha256, extractor=extractor, version=version, text=text, rows=rows, meta=meta,
+    )
+    # concurrent extractions of the same blob produce the same output
+    db.execute(stmt.on_conflict_do_nothing())
+
+def add_extractions(db: Session, extractor: str, version: str, results: List[Dict]) -> None:
+    # batch form of put_extraction (dicts with sha256/text/rows/meta); not
+    # committed, so it lands with the caller's next commit
+    values = [
+        {"sha256": r["sha256"], "extractor": extractor, "version": version,
+         "text": r.get("text"), "rows": r.get("rows"), "meta": r.get("meta")}
+        for r in results if r.get("sha256")
+    ]
+    if values:
+        db.execute(pg_insert(ExtractionResult).values(values).on_conflict_do_nothing())
+
+def rows_to_json(rows: List[Dict]) -> List[Dict]:
+    return [{**r, "occurred_at": r["occurred_at"].isoformat()} for r in rows]
+
+def rows_from_json(rows: List[Dict]) -> List[Dict]:
+    return [{**r, "occurred_at": datetime.fromisoformat(r["occurred_at"])} for r in rows]
@@ -1,6 +1,7 @@
 # src/imports/models.py
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import ForeignKey, text, CheckConstraint
+from sqlalchemy import ForeignKey, text, CheckConstraint, Index
+from sqlalchemy.dialects.postgresql import JSONB
 from src.db.base import Base
 import uuid
 from datetime import datetime
@@ -9,13 +10,43 @@ class ImportJob(Base):
     __tablename__ = "import_jobs"
     id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid.uuid4)
     user_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True)
-    source: Mapped[str]  # e.g., 'receipt', 'pdf'
+    source: Mapped[str]  # e.g., 'receipt', 'pdf', 'csv', 'ofx'
     status: Mapped[str]
     total_rows: Mapped[int | None]
     inserted_rows: Mapped[int | None]
     failed_rows: Mapped[int | None]
+    # rows skipped because the same transaction was already imported
+    duplicate_rows: Mapped[int | None]
     error_message: Mapped[str | None]
+    # per-page parse progress for statement imports
+    total_pages: Mapped[int | None]
+    parsed_pages: Mapped[int] = mapped_column(default=0, server_default=text("0"))
+    # pages whose parse raised; they are staged empty and error_message says so
+    failed_pages: Mapped[int] = mapped_column(default=0, server_default=text("0"))
+    # commit checkpoint: number of IMPORT_CHUNK_SIZE chunks already inserted
+    committed_chunks: Mapped[int] = mapped_column(default=0, server_default=text("0"))
+    # queued receipt jobs: the stored upload, worker options and the extraction result
+    attachment_id: Mapped[uuid.UUID | None] = mapped_column(ForeignKey("attachments.id", ondelete="CASCADE"))
+    payload: Mapped[dict | None] = mapped_column(JSONB)
+    result: Mapped[dict | None] = mapped_column(JSONB)
+    attempts: Mapped[int] = mapped_column(default=0, server_default=text("0"))
+    started_at: Mapped[datetime | None]
+    finished_at: Mapped[datetime | None]
     created_at: Mapped[datetime] = mapped_column(server_default=text("now()"))
     __table_args__ = (
         CheckConstraint("status in ('pending','processing','completed','failed')"),
+        # serves the worker claim query without scanning finished jobs
+        Index("ix_import_jobs_queue", "source", "created_at", postgresql_where=text("status in ('pending','processing')")),
     )
+
+class ImportRow(Base):
+    # parsed statement rows staged per job; preview and commit read from here
+    __tablename__ = "import_rows"
+    job_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("import_jobs.id", ondelete="CASCADE"), primary_key=True)
+    page: Mapped[int] = mapped_column(primary_key=True)
+    row_index: Mapped[int] = mapped_column(primary_key=True)
+    occurred_at: Mapped[datetime]
+    amount: Mapped[float]
+    type: Mapped[str]
+    merchant: Mapped[str | None]
+    notes: Mapped[str | None]
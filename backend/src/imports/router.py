@@ -1,72 +1,133 @@
 from __future__ import annotations
 import os
 from typing import List, Dict, Optional
-from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, status
+from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from pathlib import Path
 
 from src.db.session import get_db
-from src.auth.service import get_current_user
-from src.auth.models import User
-from src.imports.service import create_import_job, parse_history_pdf_content, commit_import
+from src.auth.service import get_current_principal
+from src.auth.schemas import Principal
+from src.imports.service import (
+    create_import_job, parse_history_into_staging, staged_rows, iter_staged_rows, commit_import,
+)
 from src.imports.models import ImportJob
-from src.uploads.service import ensure_storage_dir
+from src.imports.statements import (
+    StatementFormatError, detect_statement_format, parse_statement_into_staging,
+)
+from src.uploads.service import save_upload_file, attachment_path
 
 router = APIRouter(prefix="/imports", tags=["imports"])
 
+def _get_job(db: Session, user: Principal, job_id: str) -> ImportJob:
+    job = db.get(ImportJob, job_id)
+    if not job or job.user_id != user.id:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
+
 @router.post("/history-pdf")
 def upload_history_pdf(
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    user: Principal = Depends(get_current_principal),
 ):
     if file.content_type != "application/pdf":
         raise HTTPException(status_code=415, detail="Only PDF is supported for history import")
 
-    job = create_import_job(db, user, source="pdf")
     # save PDF to storage for reproducible parsing
-    user_dir = ensure_storage_dir(user)
-    pdf_path = user_dir / f"import_{job.id}.pdf"
-    content = file.file.read()
-    with open(pdf_path, "wb") as f:
-        f.write(content)
+    attachment = save_upload_file(user, file)
+    db.add(attachment)
+    db.commit()
+    job = create_import_job(db, user, source="pdf", attachment_id=attachment.id)
 
-    rows = parse_history_pdf_content(str(pdf_path))
-    if not rows:
+    # pages are parsed in parallel and staged as they finish
+    total = parse_history_into_staging(db, job, str(attachment_path(attachment)), sha256=attachment.sha256)
+    if not total:
         job.status = "failed"
-        job.error_message = "No tables found or unable to parse"
+        job.error_message = job.error_message or "No tables found or unable to parse"
         db.add(job)
         db.commit()
         raise HTTPException(status_code=422, detail="Could not parse tables from PDF")
 
-    job.status = "processing"
-    job.total_rows = len(rows)
-    db.add(job)
-    db.commit()
-    db.refresh(job)
-
     # Return a preview (first 50 rows) and job id
-    return {"job_id": str(job.id), "preview": rows[:50], "total_rows": len(rows)}
+    return {"job_id": str(job.id), "preview": staged_rows(db, job, limit=50), "total_rows": total,
+            "failed_pages": job.failed_pages, "error": job.error_message}
+
+@router.post("/statement")
+def upload_statement(
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    user: Principal = Depends(get_current_principal),
+):
+    # CSV/OFX downloads: streamed from the upload in chunks, no table detection
+    head = file.file.read(1024)
+    file.file.seek(0)
+    fmt = detect_statement_format(file.filename, file.content_type, head)
+    if fmt is None:
+        raise HTTPException(status_code=415, detail="Only CSV and OFX statements are supported")
+
+    job = create_import_job(db, user, source=fmt)
+    try:
+        total = parse_statement_into_staging(db, job, fmt, file.file)
+    except StatementFormatError as e:
+        total, error = 0, str(e)
+    else:
+        error = "No transactions found"
+    if not total:
+        job.status = "failed"
+        job.error_message = error
+        db.add(job)
+        db.commit()
+        raise HTTPException(status_code=422, detail=error)
+
+    return {"job_id": str(job.id), "preview": staged_rows(db, job, limit=50), "total_rows": total}
+
+@router.get("/{job_id}")
+def import_job_status(job_id: str,
+    db: Session = Depends(get_db),
+    user: Principal = Depends(get_current_principal),
+):
+    job = _get_job(db, user, job_id)
+    return {
+        "job_id": str(job.id),
+        "status": job.status,
+        "total_pages": job.total_pages,
+        "parsed_pages": job.parsed_pages,
+        "failed_pages": job.failed_pages,
+        "total_rows": job.total_rows,
+        "inserted_rows": job.inserted_rows,
+        "duplicate_rows": job.duplicate_rows,
+        "failed_rows": job.failed_rows,
+        "error": job.error_message,
+    }
+
+@router.get("/{job_id}/preview")
+def preview_history(job_id: str,
+    limit: int = Query(default=50, ge=1, le=500),
+    db: Session = Depends(get_db),
+    user: Principal = Depends(get_current_principal),
+):
+    job = _get_job(db, user, job_id)
+    return {"job_id": str(job.id), "preview": staged_rows(db, job, limit=limit), "total_rows": job.total_rows}
 
 @router.post("/{job_id}/commit")
 def commit_history(job_id: str,
-    rows: Optional[List[Dict]] = None,  # if provided, commit only these; else re-parse file and commit all
+    rows: Optional[List[Dict]] = None,  # if provided, commit only these; else commit all staged rows
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    user: Principal = Depends(get_current_principal),
 ):
-    job = db.get(ImportJob, job_id)
-    if not job or job.user_id != user.id:
-        raise HTTPException(status_code=404, detail="Import job not found")
-
-    # locate stored PDF
-    user_dir = ensure_storage_dir(user)
-    pdf_path = user_dir / f"import_{job.id}.pdf"
-    if not pdf_path.exists():
-        raise HTTPException(status_code=404, detail="Source PDF not found for job")
+    job = _get_job(db, user, job_id)
+    if job.status == "completed":
+        return {"job_id": str(job.id), "inserted": job.inserted_rows, "duplicates": job.duplicate_rows,
+                "failed": job.failed_rows, "total": job.total_rows}
 
-    to_commit = rows or parse_history_pdf_content(str(pdf_path))
-    if not to_commit:
+    if rows:
+        to_commit = rows
+    elif job.total_rows:
+        to_commit = iter_staged_rows(db, job)
+    else:
         raise HTTPException(status_code=422, detail="No rows to commit")
 
     inserted, failed = commit_import(db, user, job, to_commit)
-    return {"job_id": str(job.id), "inserted": inserted, "failed": failed, "total": len(to_commit)}
+    return {"job_id": str(job.id), "inserted": inserted, "duplicates": job.duplicate_rows,
+            "failed": failed, "total": job.total_rows}
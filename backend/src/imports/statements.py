@@ -0,0 +1,197 @@
+# src/imports/statements.py
+# CSV and OFX statement downloads. Both are read as text streams and yield
+# normalized rows in chunks, so memory is bounded by the chunk size rather
+# than the file: CSV chunks go through the same guess_columns/normalize_columns
+# rules as PDF tables, OFX <STMTTRN> records are mapped directly. Like OFX, a
+# signed CSV amount column is money out when negative; separate debit/credit
+# columns are read as for PDFs.
+from __future__ import annotations
+import csv
+import html
+import io
+import re
+from datetime import datetime
+from itertools import islice
+from typing import BinaryIO, Dict, Iterator, List, Optional, TextIO, Tuple
+
+import pandas as pd
+from sqlalchemy import delete
+from sqlalchemy.orm import Session
+
+from src.core.config import settings
+from src.imports.models import ImportJob, ImportRow
+from src.imports.service import guess_columns, has_amount_columns, normalize_columns, stage_import_rows
+
+STATEMENT_FORMATS = ("csv", "ofx")
+# bank exports often put account details above the header row
+CSV_HEADER_SCAN_LINES = 30
+CSV_DELIMITERS = ",;\t|"
+# an amount header naming a direction is not a signed amount column
+DIRECTION_WORDS = ("debit", "withdrawal", "credit", "deposit")
+OFX_READ_CHARS = 1 << 16
+# <TAG>value, with or without the closing tag (OFX 1.x is SGML, 2.x is XML)
+OFX_TOKEN = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<]*)")
+OFX_DATE = re.compile(r"(\d{4})(\d{2})(\d{2})(?:(\d{2})(\d{2})(\d{2})?)?")
+
+class StatementFormatError(ValueError):
+    pass
+
+def detect_statement_format(filename: Optional[str], content_type: Optional[str], head: bytes) -> Optional[str]:
+    name = (filename or "").lower()
+    if name.endswith((".ofx", ".qfx")) or content_type in ("application/x-ofx", "application/ofx"):
+        return "ofx"
+    if name.endswith(".csv") or content_type in ("text/csv", "application/csv"):
+        return "csv"
+    upper = head.lstrip().upper()
+    if upper.startswith(b"OFXHEADER") or b"<OFX>" in upper:
+        return "ofx"
+    if content_type and content_type.startswith("text/"):
+        return "csv"
+    return None
+
+def text_stream(raw: BinaryIO) -> TextIO:
+    # BOMs are common in spreadsheet exports; bad bytes should not abort an import
+    return io.TextIOWrapper(raw, encoding="utf-8-sig", errors="replace", newline="")
+
+def _signed_amount_column(headers: List[str], mapping: Dict[str, Optional[int]]) -> bool:
+    # "Amount" holds signed values; a lone "Debit" or "Credit" column
+    # promoted to the amount by guess_columns keeps the PDF convention
+    idx = mapping["amount"]
+    if idx is None:
+        return False
+    header = headers[idx].lower()
+    return "amount" in header and not any(w in header for w in DIRECTION_WORDS)
+
+def _csv_header(stream: TextIO) -> Tuple[str, Dict[str, Optional[int]], bool, int]:
+    # the first line that maps to date + amount columns under some delimiter;
+    # csv.Sniffer gives up on the free-text lines banks put above it. Returns
+    # (delimiter, mapping, signed amount column, header line number) and leaves
+    # the stream positioned after the header.
+    for lineno, line in enumerate(islice(iter(stream.readline, ""), CSV_HEADER_SCAN_LINES), start=1):
+        for delimiter in CSV_DELIMITERS:
+            if delimiter not in line:
+                continue
+            headers = [c.strip() for c in next(csv.reader([line], delimiter=delimiter))]
+            mapping = guess_columns(headers)
+            if has_amount_columns(mapping):
+                return delimiter, mapping, _signed_amount_column(headers, mapping), lineno
+    raise StatementFormatError("No header row with date and amount columns found")
+
+def _csv_records(reader, first_line: int) -> Iterator[List[str]]:
+    while True:
+        line = first_line + reader.line_num
+        try:
+            yield next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            # e.g. an unbalanced quote that swallows the rest of the file
+            raise StatementFormatError(f"Malformed CSV record starting at line {line}: {e}") from e
+
+def iter_csv_rows(stream: TextIO, chunk_size: int, notes: str = "Imported from CSV") -> Iterator[List[Dict]]:
+    delimiter, mapping, signed, header_line = _csv_header(stream)
+    records = _csv_records(csv.reader(stream, delimiter=delimiter), header_line + 1)
+    while chunk := list(islice(records, chunk_size)):
+        yield normalize_columns(pd.DataFrame(chunk, dtype=object), mapping, notes=notes, negative_is_expense=signed)
+
+def _ofx_tokens(stream: TextIO) -> Iterator[tuple]:
+    # (closing, TAG, value) across read boundaries; a partial tag at the end of
+    # a read is carried over to the next one
+    tail = ""
+    while True:
+        data = stream.read(OFX_READ_CHARS)
+        buf = tail + data
+        cut = buf.rfind("<") if data else len(buf)
+        if cut < 0:
+            cut = len(buf)
+        for m in OFX_TOKEN.finditer(buf, 0, cut):
+            yield m.group(1) == "/", m.group(2).upper(), m.group(3)
+        if not data:
+            return
+        tail = buf[cut:]
+
+def parse_ofx_date(value: str) -> Optional[datetime]:
+    # YYYYMMDD[HHMMSS[.XXX]][[+-]h:TZ]; the timezone is dropped like statement dates elsewhere
+    m = OFX_DATE.match(value.strip())
+    if not m:
+        return None
+    try:
+        return datetime(*(int(g) for g in m.groups() if g is not None))
+    except ValueError:
+        return None
+
+def _ofx_row(fields: Dict[str, str], notes: str) -> Optional[Dict]:
+    occurred_at = parse_ofx_date(fields.get("DTPOSTED", ""))
+    try:
+        amount = float(fields.get("TRNAMT", "").replace(",", ""))
+    except ValueError:
+        return None
+    if occurred_at is None:
+        return None
+    merchant = fields.get("NAME") or fields.get("PAYEE") or fields.get("MEMO") or "Imported"
+    # OFX amounts are signed from the account's side: negative is money out
+    return {
+        "occurred_at": occurred_at,
+        "amount": abs(amount),
+        "type": "expense" if amount < 0 else "income",
+        "merchant": merchant[:100],
+        "notes": notes,
+    }
+
+def iter_ofx_rows(stream: TextIO, chunk_size: int, notes: str = "Imported from OFX") -> Iterator[List[Dict]]:
+    chunk: List[Dict] = []
+    fields: Optional[Dict[str, str]] = None
+    found = False
+    for closing, tag, value in _ofx_tokens(stream):
+        if tag == "STMTTRN":
+            if closing and fields is not None:
+                row = _ofx_row(fields, notes)
+                if row:
+                    chunk.append(row)
+                    if len(chunk) >= chunk_size:
+                        yield chunk
+                        chunk = []
+            fields = None if closing else {}
+            found = True
+        elif fields is not None and not closing and value.strip():
+            fields[tag] = html.unescape(value.strip())
+    if not found:
+        raise StatementFormatError("No <STMTTRN> transactions found in OFX file")
+    if chunk:
+        yield chunk
+
+def iter_statement_rows(fmt: str, raw: BinaryIO, chunk_size: int) -> Iterator[List[Dict]]:
+    stream = text_stream(raw)
+    if fmt == "ofx":
+        return iter_ofx_rows(stream, chunk_size)
+    return iter_csv_rows(stream, chunk_size)
+
+def parse_statement_into_staging(db: Session, job: ImportJob, fmt: str, raw: BinaryIO) -> int:
+    # each chunk is staged (one bulk INSERT + commit) as a "page", so preview,
+    # commit and progress work exactly as for PDF imports
+    db.execute(delete(ImportRow).where(ImportRow.job_id == job.id))
+    job.total_pages = None
+    job.parsed_pages = 0
+    job.total_rows = 0
+    job.error_message = None
+    job.status = "processing"
+    db.add(job)
+    db.commit()
+    try:
+        for page, rows in enumerate(iter_statement_rows(fmt, raw, settings.IMPORT_CHUNK_SIZE), start=1):
+            stage_import_rows(db, job, page, rows)
+    except Exception as e:
+        # chunks staged before the error are dropped; the job must not be
+        # committed from a partial parse
+        db.rollback()
+        db.execute(delete(ImportRow).where(ImportRow.job_id == job.id))
+        job.total_rows = 0
+        job.status = "failed"
+        job.error_message = str(e) or type(e).__name__
+        db.add(job)
+        db.commit()
+        raise
+    job.total_pages = job.parsed_pages
+    db.add(job)
+    db.commit()
+    return job.total_rows or 0
@@ -24,6 +24,7 @@ app.add_middleware(
     allow_credentials=False,             
     allow_methods=["*"],                 
     allow_headers=["*"],                 
+    expose_headers=["ETag"],
 )
 
 app.include_router(auth_router)
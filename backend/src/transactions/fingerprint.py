@@ -0,0 +1,88 @@
+# src/transactions/fingerprint.py
+# Import fingerprints: a statement line or receipt maps to the same value every
+# time it is imported (date, amount, type and normalized merchant), so repeats
+# hit the partial unique index on (user_id, occurred_at, fingerprint) and are
+# dropped by INSERT ... ON CONFLICT DO NOTHING in the same statement.
+# Receipts are fingerprinted by the uploaded file instead (receipt_fingerprint):
+# two identical coffees on the same day are two receipts, while uploading the
+# same file again is a repeat.
+# Transactions entered by hand have no fingerprint and are never deduplicated.
+from __future__ import annotations
+import hashlib
+import re
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+from uuid import UUID
+
+from sqlalchemy import select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+
+from src.charts.rollup import rollup_deltas, apply_rollup_deltas
+from src.transactions.models import Transaction
+
+MERCHANT_NOISE = re.compile(r"[\W_]+")
+FINGERPRINT_WHERE = "fingerprint is not null"
+
+def normalize_merchant(merchant: Optional[str]) -> str:
+    # "AMAZON.IN  Pay*" and "amazon in pay" are the same merchant
+    return MERCHANT_NOISE.sub(" ", (merchant or "").lower()).strip()
+
+def transaction_fingerprint(
+    occurred_at: datetime, amount: float, kind: str, merchant: Optional[str], ordinal: int = 0,
+) -> str:
+    key = f"{occurred_at.date().isoformat()}|{float(amount):.2f}|{kind}|{normalize_merchant(merchant)}|{ordinal}"
+    return hashlib.sha256(key.encode()).hexdigest()
+
+def receipt_fingerprint(blob_sha256: str) -> str:
+    return hashlib.sha256(f"receipt|{blob_sha256}".encode()).hexdigest()
+
+class FingerprintSequence:
+    # Identical lines within one import (two equal coffees on the same day) get
+    # ordinals 0, 1, ... so both are kept, while importing the same statement
+    # again reproduces the same fingerprints.
+    def __init__(self):
+        self._seen: Counter = Counter()
+
+    def next(self, values: Dict) -> str:
+        occurred_at, amount, kind = values["occurred_at"], values["amount"], values["type"]
+        merchant = normalize_merchant(values.get("merchant"))
+        key = (occurred_at.date(), round(float(amount), 2), kind, merchant)
+        ordinal = self._seen[key]
+        self._seen[key] += 1
+        return transaction_fingerprint(occurred_at, amount, kind, merchant, ordinal)
+
+def insert_transactions(db: Session, user_id: UUID, values: List[Dict]) -> List[Row]:
+    # Rows whose fingerprint already exists are skipped by the database; the
+    # returned (id, fingerprint) rows are the ones actually inserted, and only
+    # those are added to the rollups.
+    if not values:
+        return []
+    stmt = (
+        pg_insert(Transaction)
+        .on_conflict_do_nothing(
+            index_elements=[Transaction.user_id, Transaction.occurred_at, Transaction.fingerprint],
+            index_where=text(FINGERPRINT_WHERE),
+        )
+        .returning(
+            Transaction.id, Transaction.fingerprint,
+            Transaction.occurred_at, Transaction.category_id, Transaction.type, Transaction.amount,
+        )
+    )
+    inserted = db.execute(stmt, values).all()
+    apply_rollup_deltas(db, user_id, rollup_deltas(
+        (r.occurred_at, r.category_id, r.type, r.amount) for r in inserted
+    ))
+    return inserted
+
+def transaction_ids_by_fingerprint(db: Session, user_id: UUID, fingerprints: Iterable[str]) -> Dict[str, UUID]:
+    fingerprints = list(set(fingerprints))
+    if not fingerprints:
+        return {}
+    rows = db.execute(
+        select(Transaction.fingerprint, Transaction.id)
+        .where(Transaction.user_id == user_id, Transaction.fingerprint.in_(fingerprints))
+    )
+    return {fp: tx_id for fp, tx_id in rows}
@@ -1,5 +1,6 @@
-from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import ForeignKey, text, CheckConstraint
+from sqlalchemy.orm import Mapped, mapped_column, declared_attr
+from sqlalchemy import ForeignKey, text, CheckConstraint, Index, Computed, event
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from src.db.base import Base
 import uuid
 from datetime import datetime
@@ -14,10 +15,52 @@ class Transaction(Base):
     category_id: Mapped[uuid.UUID | None] = mapped_column(ForeignKey("categories.id"), nullable=True)
     merchant: Mapped[str | None]
     notes: Mapped[str | None]
-    occurred_at: Mapped[datetime]
+    # partition key, so part of the table's primary key (see __table_args__)
+    occurred_at: Mapped[datetime] = mapped_column(primary_key=True)
     created_at: Mapped[datetime] = mapped_column(server_default=text("now()"))
+    # set for imported rows (statements, receipts) so re-imports are skipped;
+    # see src/transactions/fingerprint.py
+    fingerprint: Mapped[str | None]
+    # maintained by Postgres; only used in WHERE/ORDER BY of full-text search
+    search_vector: Mapped[str | None] = mapped_column(
+        TSVECTOR,
+        Computed("to_tsvector('simple', coalesce(merchant, '') || ' ' || coalesce(notes, ''))", persisted=True),
+        deferred=True,
+    )
 
     __table_args__ = (
         CheckConstraint("type in ('income','expense')"),
         CheckConstraint("amount >= 0"),
+        # full-text and trigram (ILIKE '%x%', similarity) search; trigram needs the pg_trgm extension
+        Index("ix_transactions_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_transactions_merchant_trgm", "merchant", postgresql_using="gin", postgresql_ops={"merchant": "gin_trgm_ops"}),
+        Index("ix_transactions_notes_trgm", "notes", postgresql_using="gin", postgresql_ops={"notes": "gin_trgm_ops"}),
+        # import deduplication target for ON CONFLICT DO NOTHING; unique
+        # indexes on a partitioned table must contain the partition key
+        Index("ux_transactions_user_fingerprint", "user_id", "occurred_at", "fingerprint", unique=True,
+              postgresql_where=text("fingerprint is not null")),
+        # monthly range partitions on occurred_at, created by
+        # src/transactions/partitions.py
+        {"postgresql_partition_by": "RANGE (occurred_at)"},
     )
+
+    @declared_attr.directive
+    def __mapper_args__(cls):
+        # the table key is (id, occurred_at) because Postgres requires the
+        # partition key in it; objects are still identified by id alone
+        return {"primary_key": [cls.__table__.c.id]}
+
+# serves list_transactions' ORDER BY occurred_at DESC, id and its keyset cursor
+Index(
+    "ix_transactions_user_occurred_id",
+    Transaction.user_id, Transaction.occurred_at.desc(), Transaction.id,
+)
+
+@event.listens_for(Transaction.__table__, "after_create")
+def _create_initial_partitions(target, connection, **kw):
+    # a partitioned table without partitions rejects every insert, so the
+    # DEFAULT partition and the current months are created with the table.
+    # Alembic's op.create_table builds its own Table, which does not fire
+    # this; the revision calls ensure_partitions itself (see the README)
+    from src.transactions.partitions import ensure_partitions
+    ensure_partitions(connection)
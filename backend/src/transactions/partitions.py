@@ -0,0 +1,229 @@
+# src/transactions/partitions.py
+# transactions is range-partitioned by month on occurred_at (the model declares
+# PARTITION BY RANGE), optionally with each month split into HASH(user_id)
+# sub-partitions, plus a DEFAULT partition for rows outside the created months.
+#
+# Fresh database: creating the table from the model also creates the DEFAULT
+# partition and the current months (after_create in models.py); an Alembic
+# revision that creates it with op.create_table calls
+#   ensure_partitions(op.get_bind())
+# Create upcoming months (run daily from cron; idempotent):
+#   python -m src.transactions.partitions ensure [--from 2019-01] [--ahead 3]
+# Convert an existing unpartitioned table, from an Alembic revision:
+#   from src.transactions.partitions import convert_to_partitioned
+#   def upgrade(): convert_to_partitioned(op.get_bind())
+# Check that the service queries prune partitions for a user:
+#   python -m src.transactions.partitions check --user USER_ID [--start 2024-01-01 --end 2024-02-15]
+from __future__ import annotations
+import argparse
+import json
+import logging
+import re
+import sys
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from uuid import UUID
+
+from sqlalchemy import Select
+from sqlalchemy.engine import Connection
+
+from src.core.config import settings
+from src.transactions.models import Transaction
+
+logger = logging.getLogger("app")
+
+TABLE = Transaction.__tablename__
+DEFAULT_PARTITION = f"{TABLE}_default"
+UNPARTITIONED = f"{TABLE}_unpartitioned"
+PARTITION_NAME = re.compile(rf"^{TABLE}_y(\d{{4}})m(\d{{2}})(?:_h\d+)?$")
+# columns copied when rows move between tables; generated ones are recomputed
+COPY_COLUMNS = ", ".join(c.name for c in Transaction.__table__.columns if c.computed is None)
+
+def month_start(d: date) -> date:
+    return date(d.year, d.month, 1)
+
+def add_months(month: date, n: int) -> date:
+    y, m = divmod(month.year * 12 + month.month - 1 + n, 12)
+    return date(y, m + 1, 1)
+
+def partition_name(month: date) -> str:
+    return f"{TABLE}_y{month.year}m{month.month:02d}"
+
+def partition_month(name: str) -> Optional[date]:
+    m = PARTITION_NAME.match(name)
+    return date(int(m.group(1)), int(m.group(2)), 1) if m else None
+
+def partition_ddl(month: date, hash_partitions: int = 0) -> List[str]:
+    name = partition_name(month)
+    bounds = f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    if not hash_partitions:
+        return [f"CREATE TABLE {name} PARTITION OF {TABLE} {bounds}"]
+    return [f"CREATE TABLE {name} PARTITION OF {TABLE} {bounds} PARTITION BY HASH (user_id)"] + [
+        f"CREATE TABLE {name}_h{i} PARTITION OF {name} FOR VALUES WITH (MODULUS {hash_partitions}, REMAINDER {i})"
+        for i in range(hash_partitions)
+    ]
+
+def existing_partitions(conn: Connection) -> Set[str]:
+    # direct children of transactions (sub-partitions are not listed)
+    rows = conn.exec_driver_sql(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        f"WHERE i.inhparent = '{TABLE}'::regclass"
+    )
+    return {name for (name,) in rows}
+
+def create_partition(conn: Connection, month: date, hash_partitions: int = 0) -> None:
+    # Rows for this month that landed in the DEFAULT partition (old statements,
+    # mistyped future dates) would make CREATE ... PARTITION OF fail, so they
+    # are taken out first and re-inserted through the parent afterwards.
+    lo, hi = month.isoformat(), add_months(month, 1).isoformat()
+    moved = f"_moved_{partition_name(month)}"
+    conn.exec_driver_sql(
+        f"CREATE TEMP TABLE {moved} ON COMMIT DROP AS "
+        f"WITH d AS (DELETE FROM {DEFAULT_PARTITION} WHERE occurred_at >= '{lo}' AND occurred_at < '{hi}' RETURNING *) "
+        f"SELECT {COPY_COLUMNS} FROM d"
+    )
+    for stmt in partition_ddl(month, hash_partitions):
+        conn.exec_driver_sql(stmt)
+    conn.exec_driver_sql(f"INSERT INTO {TABLE} ({COPY_COLUMNS}) SELECT {COPY_COLUMNS} FROM {moved}")
+    conn.exec_driver_sql(f"DROP TABLE {moved}")
+
+def ensure_partitions(conn: Connection, first: Optional[date] = None, ahead: Optional[int] = None) -> List[str]:
+    # monthly partitions from `first` (default: this month) through `ahead`
+    # months after this month; returns the ones created
+    ahead = settings.TRANSACTIONS_PARTITIONS_AHEAD if ahead is None else ahead
+    conn.exec_driver_sql(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT")
+    existing = existing_partitions(conn)
+    this_month = month_start(date.today())
+    month = month_start(first) if first else this_month
+    created = []
+    while month <= add_months(this_month, ahead):
+        if partition_name(month) not in existing:
+            create_partition(conn, month, settings.TRANSACTIONS_HASH_PARTITIONS)
+            created.append(partition_name(month))
+        month = add_months(month, 1)
+    return created
+
+def convert_to_partitioned(conn: Connection) -> None:
+    # One-off migration of an existing heap table: the old table and its
+    # indexes are renamed out of the way, the partitioned table is created from
+    # the model (indexes included), partitions cover the oldest row's month
+    # onwards, and the rows are copied over. Dropping the old table also drops
+    # the attachments.transaction_id foreign key, which the model no longer has.
+    conn.exec_driver_sql(f"ALTER TABLE {TABLE} RENAME TO {UNPARTITIONED}")
+    indexes = conn.exec_driver_sql(
+        "SELECT indexname FROM pg_indexes WHERE schemaname = current_schema() AND tablename = %s", (UNPARTITIONED,)
+    ).scalars().all()
+    for index in indexes:
+        conn.exec_driver_sql(f'ALTER INDEX "{index}" RENAME TO "{index[:50]}_unpartitioned"')
+    Transaction.__table__.create(conn)
+    oldest = conn.exec_driver_sql(f"SELECT min(occurred_at) FROM {UNPARTITIONED}").scalar()
+    ensure_partitions(conn, first=oldest.date() if oldest else None)
+    conn.exec_driver_sql(f"INSERT INTO {TABLE} ({COPY_COLUMNS}) SELECT {COPY_COLUMNS} FROM {UNPARTITIONED}")
+    conn.exec_driver_sql(f"DROP TABLE {UNPARTITIONED} CASCADE")
+
+# Pruning check: EXPLAIN the statements the services build and compare the
+# partitions in each plan with the months its occurred_at range can touch.
+
+def _plan_relations(plan: Dict) -> Iterator[str]:
+    if "Relation Name" in plan:
+        yield plan["Relation Name"]
+    for child in plan.get("Plans", []):
+        yield from _plan_relations(child)
+
+def scanned_partitions(conn: Connection, stmt: Select) -> Set[str]:
+    compiled = stmt.compile(dialect=conn.dialect)
+    plan = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return {r for r in _plan_relations(plan[0]["Plan"]) if r.startswith(f"{TABLE}_")}
+
+def unexpected_partitions(
+    scanned: Set[str], lo: Optional[datetime], hi: Optional[datetime], created: Set[date],
+) -> Set[str]:
+    # partitions a query over [lo, hi] should have pruned; the default one is
+    # only expected when the range reaches past the created months
+    lo_month = month_start(lo) if lo else None
+    hi_month = month_start(hi) if hi else None
+    covered = bool(created) and lo_month is not None and hi_month is not None and all(
+        m in created for m in _months(lo_month, hi_month)
+    )
+    bad = set()
+    for name in scanned:
+        month = partition_month(name)
+        if month is None:
+            if not covered:
+                continue
+        elif (lo_month is None or month >= lo_month) and (hi_month is None or month <= hi_month):
+            continue
+        bad.add(name)
+    return bad
+
+def _months(first: date, last: date) -> Iterator[date]:
+    month = first
+    while month <= last:
+        yield month
+        month = add_months(month, 1)
+
+def pruning_checks(user, start: datetime, end: datetime) -> List[Tuple[str, Select, Optional[datetime], Optional[datetime]]]:
+    # (name, statement, lower bound, upper bound) for the transactions queries
+    # of transactions.service and charts.service
+    from src.charts.service import expense_transactions_stmt, trend_transactions_stmt
+    from src.transactions.schemas import PageParams, TransactionFilters
+    from src.transactions.service import _count_stmt, encode_cursor, export_stmt, filtered_transactions_stmt, page_stmt
+
+    ranged = TransactionFilters(start=start, end=end)
+    unbounded = TransactionFilters()
+    cursor = encode_cursor(Transaction(id=UUID(int=0), occurred_at=end))
+    return [
+        ("list page, date range", page_stmt(filtered_transactions_stmt(user, ranged), ranged, PageParams()), start, end),
+        ("list count, date range", _count_stmt(filtered_transactions_stmt(user, ranged)), start, end),
+        ("list keyset page after cursor", page_stmt(filtered_transactions_stmt(user, unbounded), unbounded, PageParams(cursor=cursor)), None, end),
+        ("export, date range", export_stmt(user, ranged), start, end),
+        ("expenses by category, raw edge", expense_transactions_stmt(user, start, end), start, end),
+        ("spend trend, raw edge", trend_transactions_stmt(user, "month", "expense", start, end), start, end),
+    ]
+
+def check_pruning(conn: Connection, user, start: datetime, end: datetime) -> bool:
+    children = existing_partitions(conn)
+    created = {m for m in map(partition_month, children) if m}
+    ok = True
+    for name, stmt, lo, hi in pruning_checks(user, start, end):
+        scanned = scanned_partitions(conn, stmt)
+        bad = unexpected_partitions(scanned, lo, hi, created)
+        ok = ok and not bad
+        status = "ok" if not bad else "NOT PRUNED: " + ", ".join(sorted(bad))
+        print(f"{name:<34} {len(scanned):>4}/{len(children)} partitions  {status}")
+    return ok
+
+if __name__ == "__main__":
+    from src.db.session import SessionLocal
+    from src.auth.models import User
+
+    parser = argparse.ArgumentParser(description="Manage transactions partitions")
+    commands = parser.add_subparsers(dest="command", required=True)
+    ensure = commands.add_parser("ensure", help="create missing monthly partitions")
+    ensure.add_argument("--from", dest="first", type=lambda s: date.fromisoformat(s + "-01"), default=None,
+                        help="first month (YYYY-MM); default: this month")
+    ensure.add_argument("--ahead", type=int, default=None, help="months after this one to create")
+    check = commands.add_parser("check", help="verify partition pruning of service queries")
+    check.add_argument("--user", type=UUID, required=True)
+    check.add_argument("--start", type=datetime.fromisoformat, default=None, help="default: start of last month")
+    check.add_argument("--end", type=datetime.fromisoformat, default=None, help="default: end of last month")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    with SessionLocal() as db:
+        conn = db.connection()
+        if args.command == "ensure":
+            created = ensure_partitions(conn, args.first, args.ahead)
+            db.commit()
+            logger.info(f"created {len(created)} partitions" + (": " + ", ".join(created) if created else ""))
+        else:
+            user = db.get(User, args.user)
+            if user is None:
+                sys.exit(f"no user {args.user}")
+            last_month = add_months(month_start(date.today()), -1)
+            start = args.start or datetime.combine(last_month, time.min)
+            end = args.end or datetime.combine(add_months(last_month, 1), time.min) - timedelta(microseconds=1)
+            if not check_pruning(conn, user, start, end):
+                sys.exit(1)
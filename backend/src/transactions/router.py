@@ -1,34 +1,45 @@
 from typing import Optional
 from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 
-from src.db.session import get_db
-from src.auth.service import get_current_user
-from src.auth.models import User
+from src.db.session import get_async_db
+from src.auth.service import get_current_principal_async
+from src.auth.schemas import Principal
 from src.transactions.schemas import (
     TransactionCreate, TransactionUpdate, TransactionOut,
-    TransactionFilters, PageParams, TransactionPage,
+    TransactionFilters, PageParams, TransactionPage, CountMode, SearchMode,
+    TransactionBatch, TransactionBatchResult,
 )
 from src.transactions.service import (
-    create_transaction, get_transaction, update_transaction,
-    delete_transaction, list_transactions,
+    create_transaction_async, get_transaction_async, update_transaction_async,
+    delete_transaction_async, list_transactions_async, batch_transactions_async,
+    stream_transactions_export, ExportFormat,
 )
 
 router = APIRouter(prefix="/transactions", tags=["transactions"])
 
 @router.post("", response_model=TransactionOut, status_code=status.HTTP_201_CREATED)
-def create_tx(
+async def create_tx(
     payload: TransactionCreate,
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    user: Principal = Depends(get_current_principal_async),
 ):
-    tx = create_transaction(db, user, payload)
+    tx = await create_transaction_async(db, user, payload)
     return TransactionOut.model_validate(tx, from_attributes=True)
 
-@router.get("", response_model=TransactionPage)
-def list_tx(
+@router.post("/batch", response_model=TransactionBatchResult)
+async def batch_tx(
+    payload: TransactionBatch,
+    db: AsyncSession = Depends(get_async_db),
+    user: Principal = Depends(get_current_principal_async),
+):
+    # creates, partial updates and deletes in one transaction; per-item errors in results
+    return await batch_transactions_async(db, user, payload)
+
+def transaction_filters(
     start: Optional[datetime] = Query(default=None),
     end: Optional[datetime] = Query(default=None),
     category_id: Optional[UUID] = Query(default=None),
@@ -36,20 +47,31 @@ def list_tx(
     min_amount: Optional[float] = Query(default=None, ge=0),
     max_amount: Optional[float] = Query(default=None, ge=0),
     search: Optional[str] = Query(default=None, min_length=1, max_length=100),
-    page: int = Query(default=1, ge=1),
-    page_size: int = Query(default=20, ge=1, le=100),
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
-):
-    filters = TransactionFilters(
+    search_mode: SearchMode = Query(default="substring"),
+) -> TransactionFilters:
+    # shared by the list and export endpoints
+    return TransactionFilters(
         start=start, end=end,
         category_id=category_id,
         type=type,
         min_amount=min_amount, max_amount=max_amount,
-        search=search,
+        search=search, search_mode=search_mode,
     )
-    params = PageParams(page=page, page_size=page_size)
-    result = list_transactions(db, user, filters, params)  # likely returns a Page-like object
+
+EXPORT_MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+@router.get("", response_model=TransactionPage)
+async def list_tx(
+    filters: TransactionFilters = Depends(transaction_filters),
+    page: int = Query(default=1, ge=1),
+    page_size: int = Query(default=20, ge=1, le=100),
+    cursor: Optional[str] = Query(default=None),
+    count: CountMode = Query(default="exact"),
+    db: AsyncSession = Depends(get_async_db),
+    user: Principal = Depends(get_current_principal_async),
+):
+    params = PageParams(page=page, page_size=page_size, cursor=cursor, count=count)
+    result = await list_transactions_async(db, user, filters, params)  # likely returns a Page-like object
 
     # Ensure items are Pydantic DTOs, not ORM models
     items = [TransactionOut.model_validate(x, from_attributes=True) for x in result.items]
@@ -58,40 +80,55 @@ def list_tx(
         total=result.total,
         page=result.page,
         page_size=result.page_size,
+        next_cursor=result.next_cursor,
+    )
+
+@router.get("/export")
+async def export_tx(
+    format: ExportFormat = Query(default="csv"),
+    filters: TransactionFilters = Depends(transaction_filters),
+    user: Principal = Depends(get_current_principal_async),
+):
+    # streamed from a server-side cursor, newest first; no session dependency
+    # because the body outlives it
+    return StreamingResponse(
+        stream_transactions_export(user, filters, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="transactions.{format}"'},
     )
 
 @router.get("/{tx_id}", response_model=TransactionOut)
-def get_tx(
+async def get_tx(
     tx_id: UUID,
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    user: Principal = Depends(get_current_principal_async),
 ):
-    tx = get_transaction(db, user, tx_id)
+    tx = await get_transaction_async(db, user, tx_id)
     if not tx:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Transaction not found")
     return TransactionOut.model_validate(tx, from_attributes=True)
 
 @router.patch("/{tx_id}", response_model=TransactionOut)
-def patch_tx(
+async def patch_tx(
     tx_id: UUID,
     payload: TransactionUpdate,
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    user: Principal = Depends(get_current_principal_async),
 ):
-    tx = get_transaction(db, user, tx_id)
+    tx = await get_transaction_async(db, user, tx_id)
     if not tx:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Transaction not found")
-    tx = update_transaction(db, user, tx, payload)
+    tx = await update_transaction_async(db, user, tx, payload)
     return TransactionOut.model_validate(tx, from_attributes=True)
 
 @router.delete("/{tx_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_tx(
+async def delete_tx(
     tx_id: UUID,
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    user: Principal = Depends(get_current_principal_async),
 ):
-    tx = get_transaction(db, user, tx_id)
+    tx = await get_transaction_async(db, user, tx_id)
     if not tx:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Transaction not found")
-    delete_transaction(db, user, tx)
+    await delete_transaction_async(db, user, tx)
     return None
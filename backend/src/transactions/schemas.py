@@ -8,6 +8,7 @@ from pydantic import BaseModel, ConfigDict
 from typing import List
 
 TransactionType = Literal["income", "expense"]
+SearchMode = Literal["substring", "fulltext", "fuzzy"]
 
 class TransactionBase(BaseModel):
     type: TransactionType
@@ -36,9 +37,37 @@ class TransactionOut(TransactionBase):
     user_id: UUID
     created_at: datetime
 
+# per list in a TransactionBatch
+BATCH_MAX_ITEMS = 1000
+
+class TransactionPatch(TransactionUpdate):
+    id: UUID
+
+class TransactionBatch(BaseModel):
+    create: List[TransactionCreate] = Field(default_factory=list, max_length=BATCH_MAX_ITEMS)
+    update: List[TransactionPatch] = Field(default_factory=list, max_length=BATCH_MAX_ITEMS)
+    delete: List[UUID] = Field(default_factory=list, max_length=BATCH_MAX_ITEMS)
+
+class BatchItemResult(BaseModel):
+    op: Literal["create", "update", "delete"]
+    index: int  # position in the request list for this op
+    id: Optional[UUID] = None
+    error: Optional[str] = None  # None when the item was applied
+    transaction: Optional[TransactionOut] = None
+
+class TransactionBatchResult(BaseModel):
+    results: List[BatchItemResult]
+    created: int
+    updated: int
+    deleted: int
+
+CountMode = Literal["exact", "estimated", "none"]
+
 class PageParams(BaseModel):
     page: int = Field(default=1, ge=1)
     page_size: int = Field(default=20, ge=1, le=100)
+    cursor: Optional[str] = Field(default=None, description="next_cursor of the previous page; overrides page")
+    count: CountMode = "exact"
 
 class TransactionFilters(BaseModel):
     start: Optional[datetime] = None
@@ -48,10 +77,15 @@ class TransactionFilters(BaseModel):
     min_amount: Optional[Decimal] = None
     max_amount: Optional[Decimal] = None
     search: Optional[str] = Field(default=None, description="Matches merchant or notes")
+    search_mode: SearchMode = Field(
+        default="substring",
+        description="substring: ILIKE on merchant/notes; fulltext: ranked word-prefix match; fuzzy: ranked typo-tolerant merchant match",
+    )
 
 class TransactionPage(BaseModel):
     model_config = ConfigDict(from_attributes=True)
     items: List[TransactionOut]
-    total: int
+    total: Optional[int] = None  # None when count="none"; planner estimate when count="estimated"
     page: int
-    page_size: int
\ No newline at end of file
+    page_size: int
+    next_cursor: Optional[str] = None
\ No newline at end of file
@@ -1,17 +1,33 @@
 # src/transactions/service.py
+import base64
+import csv
+import io
+import json
+import re
 from datetime import datetime
-from typing import Tuple, List
-from uuid import UUID
+from typing import AsyncIterator, Dict, Literal, Tuple, List, Optional, Set
+from uuid import UUID, uuid4
 
-from sqlalchemy import select, func, or_
+from sqlalchemy import (
+    select, insert, update, delete, func, or_, and_, literal, cast, column, values, Select, ColumnElement,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from src.transactions.models import Transaction
 from src.transactions.schemas import (
     TransactionCreate, TransactionUpdate, TransactionOut,
     TransactionFilters, PageParams, TransactionPage,
+    TransactionBatch, TransactionBatchResult, BatchItemResult,
 )
+from src.categories.models import Category
+from src.uploads.models import Attachment
 from src.auth.models import User
+from src.charts.rollup import rollup_deltas, tx_rollup_row, apply_rollup_deltas
+from src.charts.versions import bump_data_version
+from src.core.config import settings
+from src.db.session import AsyncSessionLocal
+from src.core.exceptions import InvalidCursorError
 
 def create_transaction(db: Session, user: User, payload: TransactionCreate) -> Transaction:
     tx = Transaction(
@@ -25,6 +41,8 @@ def create_transaction(db: Session, user: User, payload: TransactionCreate) -> T
         occurred_at=payload.occurred_at,
     )
     db.add(tx)
+    apply_rollup_deltas(db, user.id, rollup_deltas([tx_rollup_row(tx)]))
+    bump_data_version(db, user.id)
     db.commit()
     db.refresh(tx)
     return tx
@@ -34,26 +52,191 @@ def get_transaction(db: Session, user: User, tx_id: UUID) -> Transaction | None:
     return db.execute(stmt).scalars().first()
 
 def update_transaction(db: Session, user: User, tx: Transaction, payload: TransactionUpdate) -> Transaction:
+    before = tx_rollup_row(tx)
     for field, value in payload.model_dump(exclude_unset=True).items():
         if field == "amount" and value is not None:
             setattr(tx, field, float(value))
         else:
             setattr(tx, field, value)
+    deltas = rollup_deltas([before], sign=-1)
+    rollup_deltas([tx_rollup_row(tx)], into=deltas)
     db.add(tx)
+    apply_rollup_deltas(db, user.id, deltas)
+    bump_data_version(db, user.id)
     db.commit()
     db.refresh(tx)
     return tx
 
+def _unlink_attachments(db: Session, tx_ids: Set[UUID]) -> None:
+    # attachments.transaction_id has no foreign key (transactions is partitioned)
+    db.execute(
+        update(Attachment).where(Attachment.transaction_id.in_(tx_ids)).values(transaction_id=None)
+        .execution_options(synchronize_session=False)
+    )
+
 def delete_transaction(db: Session, user: User, tx: Transaction) -> None:
+    apply_rollup_deltas(db, user.id, rollup_deltas([tx_rollup_row(tx)], sign=-1))
+    _unlink_attachments(db, {tx.id})
     db.delete(tx)
+    bump_data_version(db, user.id)
     db.commit()
 
-def list_transactions(
-    db: Session,
-    user: User,
-    filters: TransactionFilters,
-    page: PageParams,
-) -> TransactionPage:
+# Batch writes: every create, update and delete in a TransactionBatch is applied
+# with a few set-based statements (one DELETE ... RETURNING, one UPDATE ... FROM
+# VALUES, one multi-row INSERT) and a single rollup upsert, all in one commit.
+# Items that cannot apply get an error entry instead of failing the batch.
+
+BATCH_FIELDS = ("type", "amount", "currency", "category_id", "merchant", "notes", "occurred_at")
+NOT_NULL_FIELDS = ("type", "amount", "currency", "occurred_at")
+BATCH_OPS = ("create", "update", "delete")
+
+def _owned_category_ids(db: Session, user: User, ids: Set[UUID]) -> Set[UUID]:
+    ids = {i for i in ids if i is not None}
+    if not ids:
+        return set()
+    stmt = select(Category.id).where(Category.user_id == user.id, Category.id.in_(ids))
+    return set(db.execute(stmt).scalars())
+
+def _batch_update_stmt(user: User, rows: List[dict]):
+    columns = ("id",) + BATCH_FIELDS
+    table = Transaction.__table__
+    v = values(*(column(c, table.c[c].type) for c in columns), name="v").data(
+        [tuple(r[c] for c in columns) for r in rows]
+    )
+    # casts: a VALUES column that is NULL in every row would otherwise be text
+    return (
+        update(Transaction)
+        .where(Transaction.id == cast(v.c.id, table.c.id.type), Transaction.user_id == user.id)
+        .values({f: cast(v.c[f], table.c[f].type) for f in BATCH_FIELDS})
+        .execution_options(synchronize_session=False)
+    )
+
+def batch_transactions(db: Session, user: User, batch: TransactionBatch) -> TransactionBatchResult:
+    results: List[BatchItemResult] = []
+    deltas = rollup_deltas([])
+    delete_ids = set(batch.delete)
+    categories = _owned_category_ids(
+        db, user, {c.category_id for c in batch.create} | {u.category_id for u in batch.update}
+    )
+
+    deleted: Set[UUID] = set()
+    if delete_ids:
+        stmt = (
+            delete(Transaction)
+            .where(Transaction.user_id == user.id, Transaction.id.in_(delete_ids))
+            .returning(Transaction.id, Transaction.occurred_at, Transaction.category_id, Transaction.type, Transaction.amount)
+            .execution_options(synchronize_session=False)
+        )
+        for r in db.execute(stmt):
+            deleted.add(r.id)
+            rollup_deltas([(r.occurred_at, r.category_id, r.type, r.amount)], sign=-1, into=deltas)
+        if deleted:
+            _unlink_attachments(db, deleted)
+    for i, tx_id in enumerate(batch.delete):
+        results.append(BatchItemResult(op="delete", index=i, id=tx_id, error=None if tx_id in deleted else "Transaction not found"))
+
+    update_ids = {u.id for u in batch.update} - delete_ids
+    current: Dict[UUID, Transaction] = {}
+    if update_ids:
+        stmt = select(Transaction).where(Transaction.user_id == user.id, Transaction.id.in_(update_ids)).with_for_update()
+        current = {tx.id: tx for tx in db.execute(stmt).scalars()}
+    updated_rows: List[dict] = []
+    seen: Set[UUID] = set()
+    for i, item in enumerate(batch.update):
+        changes = item.model_dump(exclude_unset=True, exclude={"id"})
+        nulls = [f for f in NOT_NULL_FIELDS if f in changes and changes[f] is None]
+        error = None
+        if item.id in delete_ids:
+            error = "Transaction is deleted in the same batch"
+        elif item.id not in current:
+            error = "Transaction not found"
+        elif item.id in seen:
+            error = "Duplicate id in batch"
+        elif nulls:
+            error = f"{', '.join(nulls)} cannot be null"
+        elif changes.get("category_id") is not None and changes["category_id"] not in categories:
+            error = "Category not found"
+        if error:
+            results.append(BatchItemResult(op="update", index=i, id=item.id, error=error))
+            continue
+        seen.add(item.id)
+        tx = current[item.id]
+        row = {"id": tx.id, **{f: getattr(tx, f) for f in BATCH_FIELDS}, **changes}
+        row["amount"] = float(row["amount"])
+        updated_rows.append(row)
+        rollup_deltas([tx_rollup_row(tx)], sign=-1, into=deltas)
+        rollup_deltas([(row["occurred_at"], row["category_id"], row["type"], row["amount"])], into=deltas)
+        out = TransactionOut(**row, user_id=tx.user_id, created_at=tx.created_at)
+        results.append(BatchItemResult(op="update", index=i, id=tx.id, transaction=out))
+    if updated_rows:
+        db.execute(_batch_update_stmt(user, updated_rows))
+
+    created_rows: Dict[int, dict] = {}
+    for i, item in enumerate(batch.create):
+        if item.category_id is not None and item.category_id not in categories:
+            results.append(BatchItemResult(op="create", index=i, error="Category not found"))
+            continue
+        row = {"id": uuid4(), "user_id": user.id, **item.model_dump()}
+        row["amount"] = float(row["amount"])
+        created_rows[i] = row
+    if created_rows:
+        stmt = insert(Transaction).values(list(created_rows.values())).returning(Transaction.id, Transaction.created_at)
+        created_times = dict(db.execute(stmt).tuples().all())
+        for i, row in created_rows.items():
+            rollup_deltas([(row["occurred_at"], row["category_id"], row["type"], row["amount"])], into=deltas)
+            out = TransactionOut(**row, created_at=created_times[row["id"]])
+            results.append(BatchItemResult(op="create", index=i, id=row["id"], transaction=out))
+
+    apply_rollup_deltas(db, user.id, deltas)
+    if deleted or updated_rows or created_rows:
+        bump_data_version(db, user.id)
+    db.commit()
+    results.sort(key=lambda r: (BATCH_OPS.index(r.op), r.index))
+    return TransactionBatchResult(
+        results=results, created=len(created_rows), updated=len(updated_rows), deleted=len(deleted),
+    )
+
+def encode_cursor(tx: Transaction) -> str:
+    raw = json.dumps([tx.occurred_at.isoformat(), str(tx.id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        occurred_at, tx_id = json.loads(raw)
+        return datetime.fromisoformat(occurred_at), UUID(tx_id)
+    except (ValueError, TypeError):
+        raise InvalidCursorError("Invalid pagination cursor")
+
+def _prefix_tsquery(search: str) -> Optional[ColumnElement]:
+    # every word must match as a prefix: "swig del" -> swig:* & del:*
+    words = re.findall(r"\w+", search.lower())
+    if not words:
+        return None
+    return func.to_tsquery("simple", " & ".join(f"{w}:*" for w in words))
+
+def search_rank(filters: TransactionFilters) -> Optional[ColumnElement]:
+    if not filters.search:
+        return None
+    if filters.search_mode == "fulltext":
+        query = _prefix_tsquery(filters.search)
+        return func.ts_rank(Transaction.search_vector, query) if query is not None else None
+    if filters.search_mode == "fuzzy":
+        return func.word_similarity(filters.search, Transaction.merchant)
+    return None
+
+def _search_clause(filters: TransactionFilters) -> ColumnElement:
+    if filters.search_mode == "fulltext":
+        query = _prefix_tsquery(filters.search)
+        if query is not None:
+            return Transaction.search_vector.op("@@")(query)
+    elif filters.search_mode == "fuzzy":
+        # word_similarity above pg_trgm.word_similarity_threshold, served by the trigram index
+        return literal(filters.search).op("<%")(Transaction.merchant)
+    ilike = f"%{filters.search}%"
+    return or_(Transaction.merchant.ilike(ilike), Transaction.notes.ilike(ilike))
+
+def filtered_transactions_stmt(user: User, filters: TransactionFilters) -> Select:
     stmt = select(Transaction).where(Transaction.user_id == user.id)
 
     if filters.start:
@@ -69,27 +252,165 @@ def list_transactions(
     if filters.max_amount is not None:
         stmt = stmt.where(Transaction.amount <= float(filters.max_amount))
     if filters.search:
-        ilike = f"%{filters.search}%"
-        stmt = stmt.where(or_(Transaction.merchant.ilike(ilike), Transaction.notes.ilike(ilike)))
-
-    # total count on the filtered statement
-    total = db.scalar(select(func.count()).select_from(stmt.subquery())) or 0
-
-    # page-based pagination -> LIMIT/OFFSET
-    offset = (page.page - 1) * page.page_size
-    items_orm = (
-        db.execute(
-            stmt.order_by(Transaction.occurred_at.desc())
-               .offset(offset)
-               .limit(page.page_size)
-        ).scalars().all()
-    )
-    
-    items = [TransactionOut.model_validate(x, from_attributes=True) for x in items_orm]
+        stmt = stmt.where(_search_clause(filters))
+    return stmt
+
+def _explain_sql(stmt: Select, dialect) -> Tuple[str, dict]:
+    compiled = stmt.compile(dialect=dialect)
+    return f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params
+
+def _plan_rows(plan) -> int:
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+def estimate_count(db: Session, stmt: Select) -> int:
+    # planner row estimate: no scan, but only as good as the table statistics
+    sql, params = _explain_sql(stmt, db.get_bind().dialect)
+    return _plan_rows(db.connection().exec_driver_sql(sql, params).scalar())
+
+def _count_stmt(stmt: Select) -> Select:
+    return select(func.count()).select_from(stmt.subquery())
+
+def page_stmt(stmt: Select, filters: TransactionFilters, page: PageParams) -> Select:
+    # ordering + pagination for a filtered_transactions_stmt; fetches one extra
+    # row, which tells page_result whether there is a next page
+    rank = search_rank(filters)
+    if rank is not None:
+        # ranked search orders by relevance, which a (occurred_at, id) cursor cannot follow
+        if page.cursor:
+            raise InvalidCursorError("Cursor pagination is not available for ranked search")
+        stmt = stmt.order_by(rank.desc(), Transaction.occurred_at.desc(), Transaction.id.asc())
+        stmt = stmt.offset((page.page - 1) * page.page_size)
+    else:
+        # (occurred_at DESC, id) matches ix_transactions_user_occurred_id, so both
+        # the ordering and the cursor seek are served by the index
+        stmt = stmt.order_by(Transaction.occurred_at.desc(), Transaction.id.asc())
+        if page.cursor:
+            after_at, after_id = decode_cursor(page.cursor)
+            # the plain bound is implied by the OR but lets the planner prune
+            # partitions after the cursor, which it cannot do through an OR
+            stmt = stmt.where(Transaction.occurred_at <= after_at, or_(
+                Transaction.occurred_at < after_at,
+                and_(Transaction.occurred_at == after_at, Transaction.id > after_id),
+            ))
+        else:
+            # page-based pagination -> LIMIT/OFFSET
+            stmt = stmt.offset((page.page - 1) * page.page_size)
+    return stmt.limit(page.page_size + 1)
 
+def page_result(
+    items_orm: List[Transaction],
+    filters: TransactionFilters,
+    page: PageParams,
+    total: Optional[int],
+) -> TransactionPage:
+    has_more = len(items_orm) > page.page_size
+    items_orm = items_orm[:page.page_size]
+    items = [TransactionOut.model_validate(x, from_attributes=True) for x in items_orm]
+    keyset = search_rank(filters) is None
     return TransactionPage(
         items=items,
         total=total,
         page=page.page,
         page_size=page.page_size,
+        next_cursor=encode_cursor(items_orm[-1]) if has_more and keyset else None,
     )
+
+def list_transactions(
+    db: Session,
+    user: User,
+    filters: TransactionFilters,
+    page: PageParams,
+) -> TransactionPage:
+    stmt = filtered_transactions_stmt(user, filters)
+
+    total: Optional[int] = None
+    if page.count == "exact":
+        total = db.scalar(_count_stmt(stmt)) or 0
+    elif page.count == "estimated":
+        total = estimate_count(db, stmt)
+
+    items_orm = db.execute(page_stmt(stmt, filters, page)).scalars().all()
+    return page_result(items_orm, filters, page, total)
+
+# Export: rows come off a server-side cursor EXPORT_BATCH_ROWS at a time and are
+# encoded per batch, so memory does not grow with the number of rows. Plain
+# columns rather than entities keep the identity map out of it.
+
+EXPORT_COLUMNS = (
+    Transaction.id, Transaction.occurred_at, Transaction.type, Transaction.amount, Transaction.currency,
+    Transaction.category_id, Transaction.merchant, Transaction.notes, Transaction.created_at,
+)
+EXPORT_FIELDS = tuple(c.key for c in EXPORT_COLUMNS)
+ExportFormat = Literal["csv", "ndjson"]
+
+def export_stmt(user: User, filters: TransactionFilters) -> Select:
+    stmt = filtered_transactions_stmt(user, filters).with_only_columns(*EXPORT_COLUMNS)
+    return stmt.order_by(Transaction.occurred_at.desc(), Transaction.id.asc())
+
+def _export_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    return value
+
+def encode_export_rows(rows, fmt: ExportFormat, header: bool = False) -> bytes:
+    if fmt == "ndjson":
+        return "".join(
+            json.dumps(dict(zip(EXPORT_FIELDS, map(_export_value, r)))) + "\n" for r in rows
+        ).encode()
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    if header:
+        writer.writerow(EXPORT_FIELDS)
+    writer.writerows(map(_export_value, r) for r in rows)
+    return buf.getvalue().encode()
+
+async def stream_transactions_export(user: User, filters: TransactionFilters, fmt: ExportFormat) -> AsyncIterator[bytes]:
+    # Owns its session: the response body is sent after the route's
+    # dependencies (and their sessions) have already been closed.
+    if fmt == "csv":
+        yield encode_export_rows([], fmt, header=True)
+    stmt = export_stmt(user, filters).execution_options(yield_per=settings.EXPORT_BATCH_ROWS)
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(stmt)
+        async for rows in result.partitions():
+            yield encode_export_rows(rows, fmt)
+
+# Async variants for routes on the AsyncSession. Reads run natively; writes go
+# through run_sync so the rollup and cache bookkeeping above stays in one place.
+
+async def create_transaction_async(db: AsyncSession, user: User, payload: TransactionCreate) -> Transaction:
+    return await db.run_sync(create_transaction, user, payload)
+
+async def batch_transactions_async(db: AsyncSession, user: User, batch: TransactionBatch) -> TransactionBatchResult:
+    return await db.run_sync(batch_transactions, user, batch)
+
+async def get_transaction_async(db: AsyncSession, user: User, tx_id: UUID) -> Transaction | None:
+    stmt = select(Transaction).where(Transaction.id == tx_id, Transaction.user_id == user.id)
+    return (await db.execute(stmt)).scalars().first()
+
+async def update_transaction_async(db: AsyncSession, user: User, tx: Transaction, payload: TransactionUpdate) -> Transaction:
+    return await db.run_sync(update_transaction, user, tx, payload)
+
+async def delete_transaction_async(db: AsyncSession, user: User, tx: Transaction) -> None:
+    await db.run_sync(delete_transaction, user, tx)
+
+async def list_transactions_async(
+    db: AsyncSession,
+    user: User,
+    filters: TransactionFilters,
+    page: PageParams,
+) -> TransactionPage:
+    stmt = filtered_transactions_stmt(user, filters)
+
+    total: Optional[int] = None
+    if page.count == "exact":
+        total = (await db.scalar(_count_stmt(stmt))) or 0
+    elif page.count == "estimated":
+        conn = await db.connection()
+        sql, params = _explain_sql(stmt, conn.dialect)
+        total = _plan_rows((await conn.exec_driver_sql(sql, params)).scalar())
+
+    items_orm = (await db.execute(page_stmt(stmt, filters, page))).scalars().all()
+    return page_result(items_orm, filters, page, total)
@@ -8,9 +8,16 @@ class Attachment(Base):
     __tablename__ = "attachments"
     id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid.uuid4)
     user_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True)
-    transaction_id: Mapped[uuid.UUID | None] = mapped_column(ForeignKey("transactions.id", ondelete="SET NULL"))
+    # no foreign key: transactions is partitioned and keyed on (id, occurred_at);
+    # deleting a transaction clears this in transactions.service
+    transaction_id: Mapped[uuid.UUID | None] = mapped_column(index=True)
     file_name: Mapped[str]
     mime_type: Mapped[str]
     size_bytes: Mapped[int]
     storage_key: Mapped[str]
+    # content address of the stored blob; identical uploads share one file
+    sha256: Mapped[str | None] = mapped_column(index=True)
+    # OCR passes run for this file (0 = PDF text layer) and mean word confidence of the kept pass
+    ocr_passes: Mapped[int | None]
+    ocr_confidence: Mapped[float | None]
     created_at: Mapped[datetime] = mapped_column(server_default=text("now()"))
@@ -0,0 +1,157 @@
+# src/uploads/ocr.py
+# Tesseract behind a small engine interface. With the tesserocr bindings each
+# process keeps a pool of initialised API handles, so the language model is
+# loaded once per handle instead of once per image; without them we fall back
+# to pytesseract, which runs the tesseract binary for every call.
+from __future__ import annotations
+import abc
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+import pytesseract
+
+from src.core.config import settings
+
+logger = logging.getLogger("app")
+
+OCR_LANG = "eng"
+
+@dataclass
+class OcrResult:
+    text: str
+    confidence: Optional[float]  # mean word confidence 0-100; None when no words were found
+    ms: float
+    engine: str
+
+def _mean_confidence(confidences: List[float]) -> Optional[float]:
+    # tesseract reports -1 for layout entries that are not words
+    words = [c for c in confidences if c >= 0]
+    return sum(words) / len(words) if words else None
+
+class OcrEngine(abc.ABC):
+    name = "base"
+
+    @abc.abstractmethod
+    def version(self) -> str:
+        ...
+
+    @abc.abstractmethod
+    def _run(self, img: np.ndarray, psm: int) -> Tuple[str, List[float]]:
+        # text plus per-word confidences
+        ...
+
+    def recognize(self, img: np.ndarray, psm: int = 4) -> OcrResult:
+        t0 = time.perf_counter()
+        text, confidences = self._run(img, psm)
+        ms = (time.perf_counter() - t0) * 1000
+        confidence = _mean_confidence(confidences)
+        logger.debug(f"ocr {self.name} psm={psm} {img.shape[1]}x{img.shape[0]} {ms:.1f}ms conf={confidence}")
+        return OcrResult(text=text, confidence=confidence, ms=ms, engine=self.name)
+
+class PytesseractEngine(OcrEngine):
+    name = "pytesseract"
+
+    def version(self) -> str:
+        try:
+            return str(pytesseract.get_tesseract_version())
+        except Exception:
+            return "unknown"
+
+    def _run(self, img: np.ndarray, psm: int) -> Tuple[str, List[float]]:
+        # one tesseract run for both: rebuild the text line by line from the word boxes
+        data = pytesseract.image_to_data(img, lang=OCR_LANG, config=f"--psm {psm}",
+                                         output_type=pytesseract.Output.DICT)
+        lines: dict = {}
+        for i, word in enumerate(data["text"]):
+            if word.strip():
+                key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+                lines.setdefault(key, []).append(word)
+        text = "\n".join(" ".join(words) for words in lines.values())
+        return text, [float(c) for c in data["conf"]]
+
+class TesserocrEngine(OcrEngine):
+    # API handles are not thread-safe: each call checks one out, creating up to
+    # max_handles lazily, and waits for a free one beyond that
+    name = "tesserocr"
+
+    def __init__(self, max_handles: int):
+        import tesserocr
+        self._tesserocr = tesserocr
+        self.max_handles = max_handles
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def version(self) -> str:
+        # "tesseract 5.3.0\n leptonica-..." -> "5.3.0"
+        return self._tesserocr.tesseract_version().split()[1]
+
+    def _new_handle(self):
+        return self._tesserocr.PyTessBaseAPI(lang=OCR_LANG)
+
+    @contextmanager
+    def _handle(self):
+        try:
+            api = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._created < self.max_handles
+                if create:
+                    self._created += 1
+            if create:
+                try:
+                    api = self._new_handle()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                api = self._idle.get()
+        try:
+            yield api
+        finally:
+            api.Clear()
+            self._idle.put(api)
+
+    def _run(self, img: np.ndarray, psm: int) -> Tuple[str, List[float]]:
+        if img.ndim == 3:
+            img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        img = np.ascontiguousarray(img)
+        height, width = img.shape[:2]
+        bpp = 1 if img.ndim == 2 else img.shape[2]
+        with self._handle() as api:
+            api.SetPageSegMode(psm)
+            api.SetImageBytes(img.tobytes(), width, height, bpp, width * bpp)
+            text = api.GetUTF8Text()
+            return text, [float(c) for c in api.AllWordConfidences()]
+
+_engine: Optional[OcrEngine] = None
+_engine_lock = threading.Lock()
+
+def _build_engine() -> OcrEngine:
+    choice = settings.OCR_ENGINE
+    if choice in ("auto", "tesserocr"):
+        try:
+            return TesserocrEngine(settings.OCR_ENGINE_HANDLES or os.cpu_count() or 1)
+        except ImportError:
+            if choice == "tesserocr":
+                raise
+            logger.info("tesserocr not installed; OCR falls back to the pytesseract CLI wrapper")
+    return PytesseractEngine()
+
+def get_ocr_engine() -> OcrEngine:
+    # one engine per process; pool workers build their own on first use
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = _build_engine()
+    return _engine
@@ -0,0 +1,78 @@
+# src/uploads/parsing.py
+# Merchant/total/date extraction from receipt OCR text. The regexes are
+# compiled once and each field stops at its first hit; dates are validated
+# arithmetically instead of through strptime/ValueError per format. Keyword
+# searches run inside the regex engine, which measured several times faster
+# than walking every number token in Python.
+from __future__ import annotations
+import calendar
+import re
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+ParsedReceipt = Tuple[Optional[float], Optional[datetime], Optional[str]]
+
+_NUM = r"[0-9]+(?:\.[0-9]{1,2})?"
+# in order of precedence; "grand total" is covered by the total keyword and
+# the last bare number is the fallback
+AMOUNT_KEYWORDS = (
+    re.compile(rf"total\s*[:\-]?\s*₹?\s*({_NUM})"),
+    re.compile(rf"amount\s*[:\-]?\s*₹?\s*({_NUM})"),
+)
+NUMBER = re.compile(_NUM)
+# d-m-Y (any of - / or space as separator) or ISO Y-m-d
+DATE_TOKEN = re.compile(
+    r"(?P<d>\d{1,2})[-/ ](?P<m>\d{1,2})[-/ ](?P<y>\d{2,4})"
+    r"|(?P<iso_y>\d{4})-(?P<iso_m>\d{2})-(?P<iso_d>\d{2})"
+)
+MERCHANT_LETTERS = re.compile(r"[A-Za-z]{3,}")
+MERCHANT_SCAN_LINES = 8
+MERCHANT_MAX_LEN = 40
+
+def _valid_date(year: int, month: int, day: int) -> Optional[datetime]:
+    if year < 1 or not 1 <= month <= 12 or not 1 <= day <= calendar.monthrange(year, month)[1]:
+        return None
+    return datetime(year, month, day)
+
+def parse_merchant(text: str) -> Optional[str]:
+    # first reasonable alpha line among the first few non-blank ones
+    seen = 0
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if MERCHANT_LETTERS.search(line) and len(line) <= MERCHANT_MAX_LEN:
+            return line
+        seen += 1
+        if seen >= MERCHANT_SCAN_LINES:
+            return None
+    return None
+
+def parse_amount(text: str) -> Optional[float]:
+    low_text = text.lower().replace(",", "")
+    for pattern in AMOUNT_KEYWORDS:
+        m = pattern.search(low_text)
+        if m:
+            return float(m.group(1))
+    numbers = NUMBER.findall(low_text)
+    return float(numbers[-1]) if numbers else None
+
+def parse_date(text: str) -> Optional[datetime]:
+    # first candidate that is a real calendar date; d-m-Y needs a 4-digit year
+    for m in DATE_TOKEN.finditer(text):
+        if m.group("d"):
+            if len(m.group("y")) != 4:
+                continue
+            found = _valid_date(int(m.group("y")), int(m.group("m")), int(m.group("d")))
+        else:
+            found = _valid_date(int(m.group("iso_y")), int(m.group("iso_m")), int(m.group("iso_d")))
+        if found:
+            return found
+    return None
+
+def parse_receipt_text(text: str) -> ParsedReceipt:
+    return parse_amount(text), parse_date(text), parse_merchant(text)
+
+def parse_receipt_texts(texts: Iterable[str]) -> List[ParsedReceipt]:
+    # batch form for backlogs of stored OCR text
+    return [parse_receipt_text(text) for text in texts]
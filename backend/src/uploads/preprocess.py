@@ -0,0 +1,137 @@
+# src/uploads/preprocess.py
+# Receipt image preprocessing ahead of Tesseract. Phone photos are mostly
+# background and far above the resolution Tesseract needs, so the pipeline
+# crops to the paper, scales to a target text height and deskews before the
+# (resolution-proportional) threshold and OCR steps.
+from __future__ import annotations
+import time
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from src.core.config import settings
+
+Timings = Dict[str, float]  # stage -> milliseconds
+
+DETECT_MAX_SIDE = 800    # proxy size for finding the paper outline
+MEASURE_MAX_SIDE = 1600  # proxy size for measuring text height
+
+def _proxy(gray: np.ndarray, max_side: int) -> Tuple[np.ndarray, float]:
+    scale = min(1.0, max_side / max(gray.shape))
+    if scale == 1.0:
+        return gray, 1.0
+    return cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA), scale
+
+def to_gray(img: np.ndarray) -> np.ndarray:
+    return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+
+def crop_to_receipt(gray: np.ndarray) -> np.ndarray:
+    # the receipt is the largest bright region; if nothing stands out
+    # (scans, screenshots) the frame is kept as is
+    small, scale = _proxy(gray, DETECT_MAX_SIDE)
+    blur = cv2.GaussianBlur(small, (5, 5), 0)
+    _, mask = cv2.threshold(blur, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, np.ones((15, 15), np.uint8))
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return gray
+    paper = max(contours, key=cv2.contourArea)
+    coverage = cv2.contourArea(paper) / float(small.shape[0] * small.shape[1])
+    if coverage < 0.05 or coverage > 0.9:
+        return gray
+    x, y, w, h = cv2.boundingRect(paper)
+    pad = int(0.01 * max(gray.shape))
+    x0, y0 = max(int(x / scale) - pad, 0), max(int(y / scale) - pad, 0)
+    x1 = min(int((x + w) / scale) + pad, gray.shape[1])
+    y1 = min(int((y + h) / scale) + pad, gray.shape[0])
+    return gray[y0:y1, x0:x1]
+
+def estimate_text_height(gray: np.ndarray) -> Optional[float]:
+    # median height of glyph-sized connected components
+    small, scale = _proxy(gray, MEASURE_MAX_SIDE)
+    ink = cv2.adaptiveThreshold(small, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 15, 12)
+    _, _, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+    heights = stats[1:, cv2.CC_STAT_HEIGHT]
+    widths = stats[1:, cv2.CC_STAT_WIDTH]
+    areas = stats[1:, cv2.CC_STAT_AREA]
+    glyphs = (heights >= 4) & (heights <= small.shape[0] * 0.1) & (widths <= heights * 5) & (areas >= 8)
+    if glyphs.sum() < 20:
+        return None
+    return float(np.median(heights[glyphs])) / scale
+
+def normalize_scale(gray: np.ndarray, target_height: Optional[int] = None) -> np.ndarray:
+    target = target_height or settings.OCR_TARGET_TEXT_HEIGHT
+    height = estimate_text_height(gray)
+    if not height:
+        return gray
+    factor = min(max(target / height, 0.2), 3.0)
+    if abs(factor - 1.0) < 0.1:
+        return gray
+    interp = cv2.INTER_AREA if factor < 1 else cv2.INTER_CUBIC
+    return cv2.resize(gray, None, fx=factor, fy=factor, interpolation=interp)
+
+def _line_score(ink: np.ndarray, angle: float) -> float:
+    h, w = ink.shape
+    m = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+    rotated = cv2.warpAffine(ink, m, (w, h), flags=cv2.INTER_NEAREST)
+    # aligned text lines give sharply alternating row sums
+    return float(np.var(rotated.sum(axis=1)))
+
+def estimate_skew(gray: np.ndarray, max_angle: float = 10.0) -> float:
+    # projection-profile search, coarse then fine, on a small binarized copy
+    # (a local threshold, so dark background left around the paper is not ink)
+    small, _ = _proxy(gray, DETECT_MAX_SIDE)
+    ink = cv2.adaptiveThreshold(small, 1, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 15, 12)
+    coarse = max(np.arange(-max_angle, max_angle + 0.1, 1.0), key=lambda a: _line_score(ink, a))
+    fine = max(np.arange(coarse - 1.0, coarse + 1.01, 0.2), key=lambda a: _line_score(ink, a))
+    return round(float(fine), 1)
+
+def deskew(gray: np.ndarray) -> np.ndarray:
+    angle = estimate_skew(gray)
+    if abs(angle) < 0.3:
+        return gray
+    h, w = gray.shape
+    m = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+    return cv2.warpAffine(gray, m, (w, h), flags=cv2.INTER_LINEAR, borderValue=255)
+
+def binarize(gray: np.ndarray) -> np.ndarray:
+    # adaptive threshold helps uneven illumination in POS receipts
+    thr = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C,
+                                cv2.THRESH_BINARY, 15, 12)
+    # slight median blur to reduce salt-and-pepper noise
+    return cv2.medianBlur(thr, 3)
+
+def binarize_otsu(gray: np.ndarray) -> np.ndarray:
+    # global threshold; an alternative for faint thermal print that the
+    # adaptive threshold breaks up
+    blur = cv2.GaussianBlur(gray, (3, 3), 0)
+    _, thr = cv2.threshold(blur, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return thr
+
+def upscale(gray: np.ndarray, factor: float) -> np.ndarray:
+    return cv2.resize(gray, None, fx=factor, fy=factor, interpolation=cv2.INTER_CUBIC)
+
+# geometry stages; the result is still grayscale so OCR retries can threshold
+# it differently without redoing crop/scale/deskew
+PREPARE_STAGES = (
+    ("gray", to_gray),
+    ("crop", crop_to_receipt),
+    ("scale", normalize_scale),
+    ("deskew", deskew),
+)
+
+def prepare_receipt(img: np.ndarray) -> Tuple[np.ndarray, Timings]:
+    timings: Timings = {}
+    for name, stage in PREPARE_STAGES:
+        t0 = time.perf_counter()
+        img = stage(img)
+        timings[name] = (time.perf_counter() - t0) * 1000
+    return img, timings
+
+def preprocess_receipt(img: np.ndarray) -> Tuple[np.ndarray, Timings]:
+    gray, timings = prepare_receipt(img)
+    t0 = time.perf_counter()
+    out = binarize(gray)
+    timings["binarize"] = (time.perf_counter() - t0) * 1000
+    return out, timings
@@ -1,27 +1,29 @@
 from __future__ import annotations
-from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, status, BackgroundTasks
+from typing import List
+from uuid import UUID
+from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, Response, status
 from sqlalchemy.orm import Session
 
 from src.db.session import get_db
-from src.auth.service import get_current_user
-from src.auth.models import User
+from src.auth.service import get_current_principal
+from src.auth.schemas import Principal
 from src.uploads.service import (
-    save_upload_file, preprocess_image_for_ocr, ocr_image_text,
-    extract_text_from_pdf_bytes, parse_receipt_text, create_tx_from_receipt,
+    save_upload_file, process_receipt, process_receipts, enqueue_receipt_job, get_receipt_job,
 )
-from src.uploads.models import Attachment
 
 router = APIRouter(prefix="/uploads", tags=["uploads"])
 
 @router.post("/receipt")
 def upload_receipt(
+    response: Response,
     file: UploadFile = File(...),
     auto_create_tx: bool = True,
+    queued: bool = False,  # store + enqueue for the OCR workers, poll /uploads/receipt-jobs/{job_id}
     db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
+    user: Principal = Depends(get_current_principal),
 ):
     try:
-        attachment, content = save_upload_file(user, file)
+        attachment = save_upload_file(user, file)
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=str(e))
 
@@ -29,33 +31,36 @@ def upload_receipt(
     db.commit()
     db.refresh(attachment)
 
-    text = ""
-    if file.content_type in {"image/jpeg", "image/png"}:
-        img = preprocess_image_for_ocr(content)
-        text = ocr_image_text(img)
-    elif file.content_type == "application/pdf":
-        text = extract_text_from_pdf_bytes(content)
-        if not text.strip():
-            # Scanned PDFs would require rasterization + OCR; can add pdf2image later
-            raise HTTPException(status_code=422, detail="PDF has no embedded text; upload an image receipt")
-    else:
-        raise HTTPException(status_code=415, detail="Unsupported media type")
-
-    amount, occurred_at, merchant = parse_receipt_text(text)
-
-    tx = None
-    if auto_create_tx:
-        tx = create_tx_from_receipt(db, user, amount, occurred_at, merchant)
-        if tx:
-            # link the attachment to transaction
-            attachment.transaction_id = tx.id
-            db.add(attachment)
-            db.commit()
-            db.refresh(attachment)
+    if queued:
+        job = enqueue_receipt_job(db, user, attachment, auto_create_tx=auto_create_tx)
+        response.status_code = status.HTTP_202_ACCEPTED
+        return {"job_id": str(job.id), "attachment_id": str(attachment.id), "status": job.status}
 
+    return process_receipt(db, user, attachment, auto_create_tx=auto_create_tx)
+
+@router.post("/receipts")
+def upload_receipts(
+    files: List[UploadFile] = File(...),
+    auto_create_tx: bool = True,
+    db: Session = Depends(get_db),
+    user: Principal = Depends(get_current_principal),
+):
+    # one entry per file, in upload order; failed files carry "error"
+    return {"results": process_receipts(db, user, files, auto_create_tx=auto_create_tx)}
+
+@router.get("/receipt-jobs/{job_id}")
+def receipt_job_status(
+    job_id: UUID,
+    db: Session = Depends(get_db),
+    user: Principal = Depends(get_current_principal),
+):
+    job = get_receipt_job(db, user, job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Receipt job not found")
     return {
-        "attachment_id": str(attachment.id),
-        "parsed": {"amount": amount, "occurred_at": occurred_at.isoformat() if occurred_at else None, "merchant": merchant},
-        "transaction_id": str(tx.id) if tx else None,
-        "raw_excerpt": text[:1000],
+        "job_id": str(job.id),
+        "attachment_id": str(job.attachment_id) if job.attachment_id else None,
+        "status": job.status,
+        "result": job.result,
+        "error": job.error_message,
     }
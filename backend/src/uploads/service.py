@@ -1,124 +1,294 @@
 from __future__ import annotations
+import hashlib
+import io
+import logging
 import os
-import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import BinaryIO, Dict, List, Optional, Tuple, Union
 
 import cv2
 import numpy as np
-import pytesseract
+from uuid import UUID, uuid4
 from fastapi import UploadFile
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from src.uploads.models import Attachment
+from src.uploads.preprocess import prepare_receipt, binarize, binarize_otsu, upscale
+from src.uploads.ocr import get_ocr_engine
+from src.uploads.parsing import parse_receipt_text, parse_receipt_texts
+from src.imports.models import ImportJob
 from src.transactions.models import Transaction
+from src.categories.rules import get_rule_matcher
+from src.transactions.fingerprint import receipt_fingerprint, insert_transactions, transaction_ids_by_fingerprint
 from src.auth.models import User
+from src.core.exceptions import AppError, ReceiptExtractionError, TooManyFiles, UploadTooLarge
+from src.core.config import settings
+from src.core.pool import get_process_pool
+from src.extractions.service import get_extraction, get_extractions, put_extraction, add_extractions
+from src.charts.versions import bump_data_version
 
-ALLOWED_MIME = {"image/jpeg", "image/png", "application/pdf"}
+logger = logging.getLogger("app")
+
+IMAGE_MIME = {"image/jpeg", "image/png"}
+ALLOWED_MIME = IMAGE_MIME | {"application/pdf"}
 STORAGE_ROOT = Path(os.getenv("STORAGE_ROOT", "storage"))
 
-TOTAL_PATTERNS = [
-    r"total\s*[:\-]?\s*₹?\s*([0-9]+(?:\.[0-9]{1,2})?)",
-    r"amount\s*[:\-]?\s*₹?\s*([0-9]+(?:\.[0-9]{1,2})?)",
-    r"grand\s*total\s*[:\-]?\s*₹?\s*([0-9]+(?:\.[0-9]{1,2})?)",
-]
-DATE_FORMATS = ["%d-%m-%Y", "%d/%m/%Y", "%Y-%m-%d", "%d-%b-%Y", "%d %b %Y", "%m/%d/%Y"]
+# extraction cache key; bump the version whenever preprocessing or OCR code
+# changes so old results stop matching. The engine, its Tesseract version and
+# a hash of the OCR settings below are appended, so env changes miss too.
+RECEIPT_EXTRACTOR = "receipt_text"
+RECEIPT_EXTRACTOR_VERSION = "4"
+RECEIPT_OCR_SETTINGS = (
+    "OCR_MIN_CONFIDENCE", "OCR_MAX_PASSES", "OCR_TARGET_TEXT_HEIGHT", "OCR_PDF_DPI", "OCR_PDF_MAX_PAGES",
+)
+
+UPLOAD_CHUNK_BYTES = 1024 * 1024
 
-def ensure_storage_dir(user: User) -> Path:
-    user_dir = STORAGE_ROOT / str(user.id)
-    user_dir.mkdir(parents=True, exist_ok=True)
-    return user_dir
+def store_blob(stream: BinaryIO, max_bytes: Optional[int] = None) -> Tuple[str, int, str]:
+    # Copies the stream to disk chunk by chunk while hashing it, then moves it
+    # to blobs/<aa>/<bb>/<sha256>. Returns (sha256, size, storage_key).
+    max_bytes = max_bytes or settings.MAX_UPLOAD_BYTES
+    tmp_dir = STORAGE_ROOT / "tmp"
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := stream.read(UPLOAD_CHUNK_BYTES):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"File exceeds the {max_bytes} byte upload limit")
+                digest.update(chunk)
+                out.write(chunk)
+        sha256 = digest.hexdigest()
+        storage_key = f"blobs/{sha256[:2]}/{sha256[2:4]}/{sha256}"
+        dest_path = STORAGE_ROOT / storage_key
+        if dest_path.exists():
+            os.unlink(tmp_path)
+        else:
+            dest_path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp_path, dest_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return sha256, size, storage_key
 
-def save_upload_file(user: User, file: UploadFile) -> Tuple[Attachment, bytes]:
+def save_upload_file(user: User, file: UploadFile) -> Attachment:
     if file.content_type not in ALLOWED_MIME:
         raise ValueError("Unsupported file type")
-    content = file.file.read()
-    user_dir = ensure_storage_dir(user)
-    ts = datetime.utcnow().strftime("%Y%m%dT%H%M%S%fZ")
-    safe_name = f"{ts}_{file.filename}".replace(" ", "_")
-    storage_key = f"{user.id}/{safe_name}"
-    dest_path = user_dir / safe_name
-    with open(dest_path, "wb") as f:
-        f.write(content)
-    attachment = Attachment(
+    sha256, size, storage_key = store_blob(file.file)
+    return Attachment(
         user_id=user.id,
         transaction_id=None,
         file_name=file.filename,
         mime_type=file.content_type,
-        size_bytes=len(content),
+        size_bytes=size,
         storage_key=storage_key,
+        sha256=sha256,
     )
-    return attachment, content
+
+def attachment_path(attachment: Attachment) -> Path:
+    return STORAGE_ROOT / attachment.storage_key
 
 def preprocess_image_for_ocr(image_bytes: bytes) -> np.ndarray:
     npimg = np.frombuffer(image_bytes, np.uint8)
     img = cv2.imdecode(npimg, cv2.IMREAD_COLOR)
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    # adaptive threshold helps uneven illumination in POS receipts
-    thr = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C,
-                                cv2.THRESH_BINARY, 15, 12)
-    # slight median blur to reduce salt-and-pepper noise
-    blur = cv2.medianBlur(thr, 3)
-    return blur
+    return preprocess_array_for_ocr(img)
+
+def preprocess_array_for_ocr(img: np.ndarray) -> np.ndarray:
+    # crop, scale and deskew (see src/uploads/preprocess.py); the result stays
+    # grayscale and each OCR pass applies its own threshold
+    out, timings = prepare_receipt(img)
+    logger.debug("ocr preprocess ms " + " ".join(f"{k}={v:.1f}" for k, v in timings.items()))
+    return out
 
 def ocr_image_text(img: np.ndarray) -> str:
     # psm 4 = assume a single column of text of variable sizes (line by line)
-    config = "--psm 4"
-    text = pytesseract.image_to_string(img, config=config)
-    return text
+    return get_ocr_engine().recognize(img, psm=4).text
+
+@dataclass
+class ReceiptOcr:
+    text: str
+    passes: int  # OCR passes run; 0 when the text came from a PDF text layer
+    confidence: Optional[float]  # mean word confidence of the kept pass
+
+# passes after the fast psm 4 one, cheapest first: another page segmentation
+# mode (uniform block), a global threshold, then a higher-resolution image
+OCR_RETRY_PASSES = (
+    (6, binarize),
+    (4, binarize_otsu),
+    (4, lambda gray: binarize(upscale(gray, 1.5))),
+)
+
+def _has_fields(text: str) -> bool:
+    amount, occurred_at, _ = parse_receipt_text(text)
+    return amount is not None and occurred_at is not None
 
-def extract_text_from_pdf_bytes(pdf_bytes: bytes) -> str:
-    # lightweight text extraction for text-based PDFs (not scanned)
-    # Camelot/PDFMiner rely on embedded text; scanned PDFs need OCR
+def ocr_receipt(gray: np.ndarray, require_fields: bool = True) -> ReceiptOcr:
+    # retries only run when word confidence is low or (for a whole receipt) the
+    # parser cannot find both an amount and a date; the best pass is kept
+    engine = get_ocr_engine()
+    passes = ((4, binarize),) + OCR_RETRY_PASSES[:max(settings.OCR_MAX_PASSES - 1, 0)]
+    best, best_score, count = None, None, 0
+    for psm, threshold in passes:
+        result = engine.recognize(threshold(gray), psm=psm)
+        count += 1
+        fields = _has_fields(result.text) if require_fields else True
+        score = (fields, result.confidence or 0.0)
+        if best is None or score > best_score:
+            best, best_score = result, score
+        if fields and (result.confidence or 0.0) >= settings.OCR_MIN_CONFIDENCE:
+            break
+    return ReceiptOcr(text=best.text, passes=count, confidence=best.confidence)
+
+def extract_pdf_pages_text(pdf: Union[bytes, Path]) -> List[str]:
+    # embedded text per page, read one page layout at a time; pages without a
+    # text layer (scans) come back empty
     try:
-        from pdfminer.high_level import extract_text
-        return extract_text(pdf_bytes)
+        from pdfminer.high_level import extract_pages
+        from pdfminer.layout import LTTextContainer
+        source = io.BytesIO(pdf) if isinstance(pdf, bytes) else pdf
+        return [
+            "".join(el.get_text() for el in layout if isinstance(el, LTTextContainer))
+            for layout in extract_pages(source)
+        ]
     except Exception:
-        return ""
-
-def parse_receipt_text(text: str) -> Tuple[Optional[float], Optional[datetime], Optional[str]]:
-    # merchant: first reasonable alpha line (not ALL CAPS noise)
-    lines = [l.strip() for l in text.splitlines() if l.strip()]
-    merchant = None
-    for l in lines[:8]:
-        if re.search(r"[A-Za-z]{3,}", l) and len(l) <= 40:
-            merchant = l
-            break
+        return []
 
-    # total amount by regex precedence
-    amount = None
-    low_text = text.lower().replace(",", "")
-    for pat in TOTAL_PATTERNS:
-        m = re.search(pat, low_text)
-        if m:
-            try:
-                amount = float(m.group(1))
-                break
-            except ValueError:
-                pass
-    # fallback: last currency-like number
-    if amount is None:
-        m2 = re.findall(r"₹?\s*([0-9]+(?:\.[0-9]{1,2})?)", low_text)
-        if m2:
-            try:
-                amount = float(m2[-1])
-            except ValueError:
-                amount = None
-
-    # date detection: try multiple common formats
-    date = None
-    date_candidates = re.findall(r"(\d{1,2}[-/ ]\d{1,2}[-/ ]\d{2,4}|\d{4}-\d{2}-\d{2})", text)
-    for d in date_candidates:
-        for fmt in DATE_FORMATS:
+def ocr_pdf_page(pdf_path: str, page_index: int, dpi: int) -> str:
+    # runs in a pool process: renders a single page, so only one bitmap per worker is alive
+    import pypdfium2 as pdfium
+    pdf = pdfium.PdfDocument(pdf_path)
+    try:
+        bitmap = pdf[page_index].render(scale=dpi / 72, grayscale=True)
+        img = bitmap.to_numpy()
+    finally:
+        pdf.close()
+    if img.ndim == 3:
+        img = img[:, :, 0]
+    # page-level amount/date checks would misfire on multi-page receipts, so
+    # scanned pages are retried on confidence alone
+    return ocr_receipt(preprocess_array_for_ocr(img), require_fields=False)
+
+def extract_text_from_pdf(path: Path) -> ReceiptOcr:
+    # text-layer pages take the cheap pdfminer path; only scanned pages are
+    # rasterized at OCR_PDF_DPI and OCR'd, in parallel across the process pool
+    pages = extract_pdf_pages_text(path)[:settings.OCR_PDF_MAX_PAGES]
+    scanned = [i for i, t in enumerate(pages) if not t.strip()]
+    passes, confidences = 0, []
+    if scanned:
+        try:
+            import pypdfium2  # noqa: F401  optional; without it scanned pages stay empty
+        except ImportError:
+            scanned = []
+    if scanned:
+        pool = get_process_pool()
+        futures = {i: pool.submit(ocr_pdf_page, str(path), i, settings.OCR_PDF_DPI) for i in scanned}
+        for i, fut in futures.items():
             try:
-                date = datetime.strptime(d.replace(" ", "-").replace("/", "-"), fmt)
-                break
-            except ValueError:
+                ocr = fut.result()
+            except Exception:
+                pages[i] = ""
                 continue
-        if date:
-            break
-    return amount, date, merchant
+            pages[i] = ocr.text
+            passes += ocr.passes
+            if ocr.confidence is not None:
+                confidences.append(ocr.confidence)
+    confidence = sum(confidences) / len(confidences) if confidences else None
+    return ReceiptOcr(text="\n".join(pages), passes=passes, confidence=confidence)
+
+def extract_receipt(path: Path, mime_type: str) -> ReceiptOcr:
+    if mime_type in IMAGE_MIME:
+        return ocr_receipt(preprocess_image_for_ocr(path.read_bytes()))
+    if mime_type == "application/pdf":
+        result = extract_text_from_pdf(path)
+        if not result.text.strip():
+            raise ReceiptExtractionError("Could not extract any text from the PDF")
+        return result
+    raise ReceiptExtractionError("Unsupported media type")
+
+@lru_cache(maxsize=1)
+def receipt_extractor_version() -> str:
+    engine = get_ocr_engine()
+    config = ",".join(f"{k}={getattr(settings, k)}" for k in RECEIPT_OCR_SETTINGS)
+    config_hash = hashlib.sha256(config.encode()).hexdigest()[:12]
+    return f"{RECEIPT_EXTRACTOR_VERSION}/{engine.name}-{engine.version()}/{config_hash}"
+
+def _ocr_meta(result: ReceiptOcr) -> Dict:
+    return {"passes": result.passes, "confidence": result.confidence}
+
+def _record_ocr(attachment: Attachment, meta: Optional[Dict]) -> None:
+    meta = meta or {}
+    attachment.ocr_passes = meta.get("passes")
+    attachment.ocr_confidence = meta.get("confidence")
+
+def extract_receipt_text_cached(db: Session, attachment: Attachment) -> str:
+    # also records the OCR pass count/confidence on the attachment (uncommitted)
+    version = receipt_extractor_version()
+    cached = get_extraction(db, attachment.sha256, RECEIPT_EXTRACTOR, version)
+    if cached is not None:
+        _record_ocr(attachment, cached.meta)
+        return cached.text or ""
+    result = extract_receipt(attachment_path(attachment), attachment.mime_type)
+    _record_ocr(attachment, _ocr_meta(result))
+    db.add(attachment)
+    put_extraction(db, attachment.sha256, RECEIPT_EXTRACTOR, version, text=result.text, meta=_ocr_meta(result))
+    return result.text
+
+def receipt_transaction(
+    user: User,
+    amount: Optional[float],
+    occurred_at: Optional[datetime],
+    merchant: Optional[str],
+    blob_sha256: Optional[str] = None,
+) -> Optional[Dict]:
+    # insert values; the fingerprint comes from the stored file, so uploading
+    # the same file again resolves to the transaction it created the first
+    # time. Without a file there is nothing to match and it is unique.
+    if amount is None or occurred_at is None:
+        return None
+    return {
+        "user_id": user.id,
+        "type": "expense",
+        "amount": amount,
+        "currency": "INR",
+        "category_id": None,
+        "merchant": merchant,
+        "notes": "Imported from receipt",
+        "occurred_at": occurred_at,
+        "fingerprint": receipt_fingerprint(blob_sha256 or uuid4().hex),
+    }
+
+def link_receipt_transactions(db: Session, user: User, values: List[Dict]) -> Tuple[Dict[str, UUID], int]:
+    # fingerprint -> transaction id, inserting only the ones not seen before
+    # (in the caller's transaction); also returns how many were new. Existing
+    # ones are looked up first because a newer extractor may parse another
+    # date from the same file, which the unique index would not catch.
+    unique = {v["fingerprint"]: v for v in values}
+    ids = transaction_ids_by_fingerprint(db, user.id, unique)
+    new = [v for fp, v in unique.items() if fp not in ids]
+    get_rule_matcher(db, user.id).categorize(new)
+    inserted = insert_transactions(db, user.id, new)
+    ids.update({r.fingerprint: r.id for r in inserted})
+    # a concurrent upload of the same file may have won the insert
+    ids.update(transaction_ids_by_fingerprint(db, user.id, (fp for fp in unique if fp not in ids)))
+    return ids, len(inserted)
+
+def _link_receipt(db: Session, user: User, parsed, blob_sha256: Optional[str]) -> Tuple[Optional[UUID], int]:
+    # (transaction id, rows inserted) in the caller's transaction
+    values = receipt_transaction(user, *parsed, blob_sha256=blob_sha256)
+    if values is None:
+        return None, 0
+    ids, inserted = link_receipt_transactions(db, user, [values])
+    return ids.get(values["fingerprint"]), inserted
 
 def create_tx_from_receipt(
     db: Session,
@@ -126,20 +296,163 @@ def create_tx_from_receipt(
     amount: Optional[float],
     occurred_at: Optional[datetime],
     merchant: Optional[str],
+    blob_sha256: Optional[str] = None,
 ) -> Optional[Transaction]:
-    if amount is None or occurred_at is None:
-        return None
-    tx = Transaction(
+    tx_id, inserted = _link_receipt(db, user, (amount, occurred_at, merchant), blob_sha256)
+    if inserted:
+        bump_data_version(db, user.id)
+    db.commit()
+    return db.get(Transaction, tx_id) if tx_id else None
+
+def _receipt_result(attachment_id, text: str, parsed, transaction_id, ocr: Optional[Dict]) -> Dict:
+    amount, occurred_at, merchant = parsed
+    ocr = ocr or {}
+    return {
+        "attachment_id": str(attachment_id),
+        "parsed": {"amount": amount, "occurred_at": occurred_at.isoformat() if occurred_at else None, "merchant": merchant},
+        "transaction_id": str(transaction_id) if transaction_id else None,
+        "raw_excerpt": text[:1000],
+        "ocr": {"passes": ocr.get("passes"), "confidence": ocr.get("confidence")},
+    }
+
+def apply_receipt(
+    db: Session,
+    user: User,
+    attachment: Attachment,
+    auto_create_tx: bool = True,
+) -> Tuple[Dict, int]:
+    # OCR, transaction and attachment link without committing, so the worker
+    # can complete its job in the same commit; returns (result, rows inserted)
+    text = extract_receipt_text_cached(db, attachment)
+    parsed = parse_receipt_text(text)
+
+    tx_id, inserted = None, 0
+    if auto_create_tx:
+        tx_id, inserted = _link_receipt(db, user, parsed, attachment.sha256)
+        if tx_id:
+            # link the attachment to transaction
+            attachment.transaction_id = tx_id
+    db.add(attachment)
+    db.flush()
+
+    ocr = {"passes": attachment.ocr_passes, "confidence": attachment.ocr_confidence}
+    return _receipt_result(attachment.id, text, parsed, tx_id, ocr), inserted
+
+def process_receipt(
+    db: Session,
+    user: User,
+    attachment: Attachment,
+    auto_create_tx: bool = True,
+) -> Dict:
+    result, inserted = apply_receipt(db, user, attachment, auto_create_tx)
+    if inserted:
+        bump_data_version(db, user.id)
+    db.commit()
+    return result
+
+def _extract_batch(blobs: Dict[str, Tuple[Path, str]]) -> Tuple[Dict[str, ReceiptOcr], Dict[str, str]]:
+    # sha256 -> (path, mime) OCR'd on a bounded thread pool (OCR and OpenCV
+    # release the GIL; scanned PDFs fan out to the process pool themselves)
+    done: Dict[str, ReceiptOcr] = {}
+    errors: Dict[str, str] = {}
+    if not blobs:
+        return done, errors
+    with ThreadPoolExecutor(max_workers=settings.RECEIPT_BATCH_CONCURRENCY) as executor:
+        futures = {executor.submit(extract_receipt, path, mime): sha for sha, (path, mime) in blobs.items()}
+        for fut in as_completed(futures):
+            sha = futures[fut]
+            try:
+                done[sha] = fut.result()
+            except AppError as e:
+                errors[sha] = e.message
+            except Exception as e:
+                logger.exception(f"receipt extraction failed for blob {sha}: {e}")
+                errors[sha] = "Could not extract text from the receipt"
+    return done, errors
+
+def process_receipts(
+    db: Session,
+    user: User,
+    files: List[UploadFile],
+    auto_create_tx: bool = True,
+) -> List[Dict]:
+    # Stores every file and commits the attachments together, OCRs each
+    # distinct uncached blob concurrently, then writes the OCR cache entries,
+    # transactions and attachment links in one more commit. A file that cannot
+    # be stored or read gets an error entry; the others still go through.
+    if len(files) > settings.RECEIPT_BATCH_MAX_FILES:
+        raise TooManyFiles(f"At most {settings.RECEIPT_BATCH_MAX_FILES} files per request")
+    results: List[Dict] = [{"file_name": f.filename, "error": None} for f in files]
+    attachments: Dict[int, Attachment] = {}
+    for i, f in enumerate(files):
+        try:
+            attachments[i] = save_upload_file(user, f)
+        except ValueError as e:
+            results[i]["error"] = str(e)
+        except AppError as e:
+            results[i]["error"] = e.message
+    if not attachments:
+        return results
+    db.add_all(attachments.values())
+    db.flush()
+    # plain values, so nothing below reloads the attachments after commit
+    stored = {i: (a.id, a.sha256, attachment_path(a), a.mime_type) for i, a in attachments.items()}
+    db.commit()
+
+    version = receipt_extractor_version()
+    cached = get_extractions(db, (sha for _, sha, _, _ in stored.values()), RECEIPT_EXTRACTOR, version)
+    texts = {sha: r.text or "" for sha, r in cached.items()}
+    metas = {sha: r.meta for sha, r in cached.items()}
+    extracted, errors = _extract_batch(
+        {sha: (path, mime) for _, sha, path, mime in stored.values() if sha not in cached}
+    )
+    for sha, result in extracted.items():
+        texts[sha] = result.text
+        metas[sha] = _ocr_meta(result)
+    add_extractions(db, RECEIPT_EXTRACTOR, version, [
+        {"sha256": sha, "text": result.text, "meta": _ocr_meta(result)} for sha, result in extracted.items()
+    ])
+
+    readable = [i for i in sorted(stored) if stored[i][1] in texts]
+    parsed = dict(zip(readable, parse_receipt_texts(texts[stored[i][1]] for i in readable)))
+    txs: Dict[int, Dict] = {}
+    for i in readable:
+        _record_ocr(attachments[i], metas.get(stored[i][1]))
+        values = receipt_transaction(user, *parsed[i], blob_sha256=stored[i][1]) if auto_create_tx else None
+        if values is not None:
+            txs[i] = values
+    # files already imported (earlier or twice in this batch) link to the
+    # existing transaction
+    by_fingerprint, inserted = link_receipt_transactions(db, user, list(txs.values())) if txs else ({}, 0)
+    tx_ids = {i: by_fingerprint.get(v["fingerprint"]) for i, v in txs.items()}
+    for i, tx_id in tx_ids.items():
+        attachments[i].transaction_id = tx_id
+    if inserted:
+        bump_data_version(db, user.id)
+    db.commit()
+
+    for i, (attachment_id, sha, _, _) in stored.items():
+        if i in parsed:
+            results[i].update(_receipt_result(attachment_id, texts[sha], parsed[i], tx_ids.get(i), metas.get(sha)))
+        else:
+            results[i].update({"attachment_id": str(attachment_id), "error": errors.get(sha)})
+    return results
+
+def enqueue_receipt_job(db: Session, user: User, attachment: Attachment, auto_create_tx: bool = True) -> ImportJob:
+    job = ImportJob(
         user_id=user.id,
-        type="expense",
-        amount=amount,
-        currency="INR",
-        category_id=None,
-        merchant=merchant,
-        notes="Imported from receipt",
-        occurred_at=occurred_at,
+        source="receipt",
+        status="pending",
+        attachment_id=attachment.id,
+        payload={"auto_create_tx": auto_create_tx},
     )
-    db.add(tx)
+    db.add(job)
     db.commit()
-    db.refresh(tx)
-    return tx
+    db.refresh(job)
+    return job
+
+def get_receipt_job(db: Session, user: User, job_id: UUID) -> Optional[ImportJob]:
+    stmt = select(ImportJob).where(
+        ImportJob.id == job_id, ImportJob.user_id == user.id, ImportJob.source == "receipt"
+    )
+    return db.execute(stmt).scalars().first()
@@ -0,0 +1,105 @@
+# src/uploads/worker.py
+# Receipt OCR worker: python -m src.uploads.worker
+# Any number of these can run against the same database; jobs are claimed with
+# SELECT ... FOR UPDATE SKIP LOCKED so two workers never pick the same row.
+from __future__ import annotations
+import argparse
+import logging
+import time
+from datetime import timedelta
+from typing import Optional
+
+from sqlalchemy import select, update, or_, and_, func
+from sqlalchemy.orm import Session
+
+from src.db.session import SessionLocal
+from src.core.config import settings
+from src.imports.models import ImportJob
+from src.uploads.models import Attachment
+from src.uploads.service import apply_receipt
+from src.charts.versions import bump_data_version
+from src.auth.models import User
+
+logger = logging.getLogger("app")
+
+def _stale_before():
+    return func.now() - timedelta(seconds=settings.RECEIPT_JOB_LEASE_SECONDS)
+
+def claim_receipt_job(db: Session) -> Optional[ImportJob]:
+    # jobs whose worker died mid-run are reclaimed once their lease runs out
+    claimable = or_(
+        ImportJob.status == "pending",
+        and_(ImportJob.status == "processing", ImportJob.started_at < _stale_before()),
+    )
+    db.execute(
+        update(ImportJob)
+        .where(ImportJob.source == "receipt", claimable)
+        .where(ImportJob.attempts >= settings.RECEIPT_JOB_MAX_ATTEMPTS)
+        .values(status="failed", error_message="Exceeded retry attempts", finished_at=func.now())
+    )
+    stmt = (
+        select(ImportJob)
+        .where(ImportJob.source == "receipt", claimable)
+        .order_by(ImportJob.created_at.asc())
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    job = db.execute(stmt).scalars().first()
+    if job is None:
+        db.commit()
+        return None
+    job.status = "processing"
+    job.attempts += 1
+    job.started_at = func.now()
+    db.commit()
+    db.refresh(job)
+    return job
+
+def run_receipt_job(db: Session, job: ImportJob) -> None:
+    attachment = db.get(Attachment, job.attachment_id)
+    user = db.get(User, job.user_id)
+    options = job.payload or {}
+    try:
+        if attachment is None or user is None:
+            raise LookupError("Attachment for job no longer exists")
+        result, inserted = apply_receipt(db, user, attachment, auto_create_tx=options.get("auto_create_tx", True))
+    except Exception as e:
+        logger.exception(f"receipt job {job.id} failed: {e}")
+        db.rollback()
+        job.status = "failed"
+        job.error_message = str(e)[:500]
+        job.finished_at = func.now()
+        db.add(job)
+        db.commit()
+        return
+    # completed in the same commit as the receipt's transaction and link, so a
+    # crash cannot leave written rows behind a job that will be reclaimed
+    job.status = "completed"
+    job.result = result
+    job.error_message = None
+    job.finished_at = func.now()
+    db.add(job)
+    if inserted:
+        bump_data_version(db, user.id)
+    db.commit()
+
+def run_worker(poll_seconds: Optional[float] = None, once: bool = False) -> None:
+    interval = poll_seconds if poll_seconds is not None else settings.RECEIPT_WORKER_POLL_SECONDS
+    logger.info(f"receipt worker started (poll every {interval}s)")
+    while True:
+        with SessionLocal() as db:
+            job = claim_receipt_job(db)
+            if job is not None:
+                run_receipt_job(db, job)
+        if once:
+            return
+        if job is None:
+            time.sleep(interval)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Process queued receipt OCR jobs")
+    parser.add_argument("--poll-seconds", type=float, default=None)
+    parser.add_argument("--once", action="store_true", help="claim at most one job and exit")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    run_worker(args.poll_seconds, once=args.once)